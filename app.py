@@ -7,13 +7,27 @@ import datetime
 import traceback
 import os
 import hashlib
+import json
+import queue
+import atexit
+import re
+import csv
+import sqlite3
+import tempfile
+import contextlib
+import pickle
 import io
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import copy
+import functools
 import random
 import string
 import time
+import threading
+from google.api_core import exceptions as gcp_exceptions
+from collections import OrderedDict, defaultdict, deque
+
+# Her çalıştırmanın başlangıcı; main() öncesi sabit yük bundan ölçülür
+BETIK_BASI = time.perf_counter()
 
 # --- SAYFA AYARLARI ---
 st.set_page_config(
@@ -237,6 +251,10 @@ def check_hashes(password, hashed_text):
 def send_email(to_email, username, new_password):
     if "email" not in st.secrets:
         return False, t("no_email_config")
+    # Yalnızca şifre sıfırlamada gerekir; her çalıştırmada yüklenmez
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
     
     sender_email = st.secrets["email"]["sender"]
     sender_password = st.secrets["email"]["password"]
@@ -262,7 +280,6 @@ def send_email(to_email, username, new_password):
         return False, str(e)
 
 # --- DB BAĞLANTISI ---
-@st.cache_resource
 def init_db():
     if not firebase_admin._apps:
         if "firebase" in st.secrets:
@@ -283,14 +300,12 @@ def init_db():
             st.stop()
     return firestore.client()
 
-try:
-    db = init_db()
-except Exception as e:
-    st.error(f"DB Error: {e}")
-    st.stop()
-
 # --- İLK KURULUM ---
-def update_or_create_admin():
+# DB bağlantısı ve admin hesabı kontrolü süreç başına bir kez yapılır; sonraki
+# çalıştırmalar ve diğer oturumlar önbellekteki istemciyi kullanır, giriş ekranı
+# Firestore'a yalnızca kimlik kontrolü için gider. Süreler yönetici panelinde
+# gösterilir.
+def update_or_create_admin(db):
     users_ref = db.collection('system_users')
     doc = users_ref.document("admin").get()
     full_perms = ["view", "search", "add", "update", "delete", "delete_table", "upload", "report", "logs", "transfer", "admin_panel"]
@@ -303,47 +318,2112 @@ def update_or_create_admin():
         if "transfer" not in current_perms:
             users_ref.document("admin").update({"permissions": full_perms})
 
-update_or_create_admin()
+@st.cache_resource
+def sureci_hazirla():
+    t0 = time.perf_counter()
+    db = init_db()
+    t1 = time.perf_counter()
+    update_or_create_admin(db)
+    t2 = time.perf_counter()
+    return {"db": db, "baglanti": t1 - t0, "admin": t2 - t1, "zaman": datetime.datetime.now()}
+
+try:
+    KURULUM = sureci_hazirla()
+    db = KURULUM["db"]
+except Exception as e:
+    st.error(f"DB Error: {e}")
+    st.stop()
 
 # --- LOG ---
-def log_kayit_ekle(islem_turu, fonksiyon_adi, mesaj, teknik_detay="-"):
-    kullanici = st.session_state.get("username", "System")
-    mesaj = f"[{kullanici}] {mesaj}"
-    log_dosya_adi = "Sistem_Loglari.xlsx"
-    zaman = datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-    yeni_kayit = {"Tarih_Saat": [zaman], "İşlem_Türü": [islem_turu], "Fonksiyon": [fonksiyon_adi], "Mesaj": [mesaj], "Teknik_Detay": [teknik_detay]}
+# Loglar JSON Lines dosyasına yalnızca eklenerek yazılır. Yazma işi arka plandaki
+# tek bir iş parçacığına kuyrukla devredilir; dosya kilidi (flock) birden çok
+# sürecin aynı dosyaya güvenle eklemesini sağlar. Boyutu aşan dosya döndürülür.
+# Excel yalnızca dışa aktarma sırasında üretilir.
+LOG_KLASORU = "logs"
+LOG_DOSYASI = os.path.join(LOG_KLASORU, "Sistem_Loglari.jsonl")
+LOG_MAX_BOYUT = 5 * 1024 * 1024
+ESKI_LOG_EXCEL = "Sistem_Loglari.xlsx"
+ESKI_LOG_DOSYASI = LOG_DOSYASI.replace(".jsonl", ".00000000-eski.jsonl")
+
+def _dosya_kilidi(f, kilitle):
+    try: import fcntl
+    except ImportError: return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX if kilitle else fcntl.LOCK_UN)
+
+class LogYazici:
+    def __init__(self, dosya, depo=None):
+        self.dosya = dosya
+        self.depo = depo
+        self.kuyruk = queue.Queue()
+        threading.Thread(target=self._calis, name="log-yazici", daemon=True).start()
+        atexit.register(self.bosalt)
+
+    def yaz(self, kayit):
+        self.kuyruk.put(kayit)
+
+    def _topla(self, ilk):
+        kayitlar = [ilk]
+        while True:
+            try: kayitlar.append(self.kuyruk.get_nowait())
+            except queue.Empty: return kayitlar
+
+    def _calis(self):
+        while True:
+            kayitlar = self._topla(self.kuyruk.get())
+            try: self._ekle(kayitlar)
+            except: pass
+
+    def bosalt(self):
+        try: self._ekle(self._topla(self.kuyruk.get_nowait()))
+        except queue.Empty: pass
+        except: pass
+
+    def _ekle(self, kayitlar):
+        veri = "".join(json.dumps(k, ensure_ascii=False, default=str) + "\n" for k in kayitlar).encode("utf-8")
+        os.makedirs(os.path.dirname(self.dosya), exist_ok=True)
+        while True:
+            with open(self.dosya, "ab") as f:
+                _dosya_kilidi(f, True)
+                try:
+                    # Kilidi beklerken başka bir süreç dosyayı döndürdüyse yenisini aç
+                    try: ayni = os.fstat(f.fileno()).st_ino == os.stat(self.dosya).st_ino
+                    except FileNotFoundError: ayni = False
+                    if not ayni: continue
+                    boyut = os.fstat(f.fileno()).st_size
+                    if boyut and boyut + len(veri) > LOG_MAX_BOYUT:
+                        os.rename(self.dosya, self.dosya.replace(".jsonl", datetime.datetime.now().strftime(".%Y%m%d-%H%M%S-%f.jsonl")))
+                        continue
+                    f.write(veri)
+                    f.flush()
+                    break
+                finally: _dosya_kilidi(f, False)
+        # İndeks JSONL'den türetilir; eklenemeyen kayıt olursa indeks bir sonraki
+        # yazımda dosyalardan baştan kurulur (bu kayıtlar dosyada zaten vardır)
+        if self.depo:
+            try:
+                if self.depo.kirli: self.depo.yeniden_kur()
+                else: self.depo.ekle(kayitlar)
+            except: self.depo.kirli = True
+
+def _eski_excel_logu_tasi():
+    # Excel'e yazılmış eski loglar bir kez arşiv dosyasına aktarılır; yarım
+    # kalan dönüşüm dosya adını almaz, sonraki açılışta yeniden denenir
+    if not os.path.exists(ESKI_LOG_EXCEL) or os.path.exists(ESKI_LOG_DOSYASI): return
     try:
-        if os.path.exists(log_dosya_adi):
-            pd.concat([pd.read_excel(log_dosya_adi), pd.DataFrame(yeni_kayit)], ignore_index=True).to_excel(log_dosya_adi, index=False)
-        else:
-            pd.DataFrame(yeni_kayit).to_excel(log_dosya_adi, index=False)
+        os.makedirs(LOG_KLASORU, exist_ok=True)
+        eski = pd.read_excel(ESKI_LOG_EXCEL).astype(str)
+        with open(ESKI_LOG_DOSYASI + ".tmp", "w", encoding="utf-8") as f:
+            for kayit in eski.to_dict('records'): f.write(json.dumps(kayit, ensure_ascii=False) + "\n")
+        os.replace(ESKI_LOG_DOSYASI + ".tmp", ESKI_LOG_DOSYASI)
+    except: pass
+
+# --- LOG İNDEKSİ ---
+# Log Kayıtları sayfası için JSONL dosyalarından türetilen SQLite indeksi (WAL).
+# Tarih, kullanıcı, işlem türü ve tablo indekslidir; Mesaj için FTS5 kullanılır.
+LOG_VERITABANI = os.path.join(LOG_KLASORU, "Sistem_Loglari.db")
+LOG_SUTUNLARI = ["id", "Tarih_Saat", "Kullanıcı", "İşlem_Türü", "Fonksiyon", "Tablo", "Mesaj", "Teknik_Detay"]
+
+def _log_satiri(k):
+    ts = k.get("ts")
+    if ts is None:
+        try: ts = datetime.datetime.strptime(str(k.get("Tarih_Saat")), "%d.%m.%Y %H:%M:%S").timestamp()
+        except ValueError: ts = 0
+    mesaj = str(k.get("Mesaj", ""))
+    kullanici = k.get("Kullanıcı") or (mesaj[1:mesaj.index("]")] if mesaj.startswith("[") and "]" in mesaj else None)
+    tablo = k.get("Tablo")
+    if not tablo:
+        eslesme = re.search(r"Tablo(?: Güncellendi| Silindi)?: ([^,]+)", f"{mesaj} {k.get('Teknik_Detay', '')}")
+        tablo = eslesme.group(1).strip() if eslesme else None
+    return (ts, k.get("Tarih_Saat"), kullanici, k.get("İşlem_Türü"), k.get("Fonksiyon"), tablo, mesaj, str(k.get("Teknik_Detay", "")))
+
+class LogDeposu:
+    def __init__(self, yol):
+        self.yol = yol
+        self.kirli = False   # eklenemeyen kayıt var; indeks yeniden kurulmalı
+        os.makedirs(os.path.dirname(yol), exist_ok=True)
+        with contextlib.closing(self._baglanti()) as c:
+            c.executescript("""
+                CREATE TABLE IF NOT EXISTS loglar (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, tarih_saat TEXT, kullanici TEXT,
+                    islem_turu TEXT, fonksiyon TEXT, tablo TEXT, mesaj TEXT, teknik_detay TEXT);
+                CREATE INDEX IF NOT EXISTS loglar_ts ON loglar(ts);
+                CREATE INDEX IF NOT EXISTS loglar_kullanici ON loglar(kullanici, id);
+                CREATE INDEX IF NOT EXISTS loglar_islem ON loglar(islem_turu, id);
+                CREATE INDEX IF NOT EXISTS loglar_tablo ON loglar(tablo, id);
+                CREATE TABLE IF NOT EXISTS aktarimlar (dosya TEXT PRIMARY KEY);
+            """)
+            try:
+                c.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS loglar_fts USING fts5(mesaj, content='loglar', content_rowid='id');
+                    CREATE TRIGGER IF NOT EXISTS loglar_ai AFTER INSERT ON loglar BEGIN
+                        INSERT INTO loglar_fts(rowid, mesaj) VALUES (new.id, new.mesaj);
+                    END;
+                """)
+                self.fts = True
+            except sqlite3.OperationalError: self.fts = False
+            bos = c.execute("SELECT COUNT(*) FROM loglar").fetchone()[0] == 0
+        if bos: self.yeniden_kur()
+
+    def _baglanti(self):
+        c = sqlite3.connect(self.yol, timeout=30)
+        c.execute("PRAGMA journal_mode=WAL")
+        return c
+
+    @staticmethod
+    def _ekle(c, kayitlar):
+        c.executemany("INSERT INTO loglar (ts, tarih_saat, kullanici, islem_turu, fonksiyon, tablo, mesaj, teknik_detay) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [_log_satiri(k) for k in kayitlar])
+
+    @staticmethod
+    def _dosya_kayitlari(dosya, parca=5000):
+        kayitlar = []
+        with open(dosya, encoding="utf-8") as f:
+            for satir in f:
+                try: kayitlar.append(json.loads(satir))
+                except ValueError: continue
+                if len(kayitlar) >= parca:
+                    yield kayitlar
+                    kayitlar = []
+        if kayitlar: yield kayitlar
+
+    def ekle(self, kayitlar):
+        with contextlib.closing(self._baglanti()) as c, c: self._ekle(c, kayitlar)
+
+    def yeniden_kur(self):
+        # İndeks tek işlemde boşaltılıp tüm JSONL dosyalarından yeniden doldurulur
+        with contextlib.closing(self._baglanti()) as c, c:
+            c.execute("DELETE FROM loglar")
+            if self.fts: c.execute("INSERT INTO loglar_fts(loglar_fts) VALUES ('delete-all')")
+            for dosya in log_dosyalari():
+                for kayitlar in self._dosya_kayitlari(dosya): self._ekle(c, kayitlar)
+            if os.path.exists(ESKI_LOG_DOSYASI): c.execute("INSERT OR IGNORE INTO aktarimlar VALUES (?)", (os.path.basename(ESKI_LOG_DOSYASI),))
+        self.kirli = False
+
+    def eski_logu_aktar(self):
+        # Excel'den dönüştürülen eski loglar indeks kurulduktan sonra gelmiş
+        # olabilir; dosya bir kez eklenir. İlk kaydı zaten indeksteyse (önceki
+        # sürümde yeniden kurmayla eklenmiş) yalnızca işaretlenir.
+        if not os.path.exists(ESKI_LOG_DOSYASI): return
+        ad = os.path.basename(ESKI_LOG_DOSYASI)
+        with contextlib.closing(self._baglanti()) as c, c:
+            if c.execute("SELECT 1 FROM aktarimlar WHERE dosya = ?", (ad,)).fetchone(): return
+            c.execute("INSERT INTO aktarimlar VALUES (?)", (ad,))
+            ilk = next(self._dosya_kayitlari(ESKI_LOG_DOSYASI, 1), None)
+            if ilk is None: return
+            satir = _log_satiri(ilk[0])
+            if c.execute("SELECT 1 FROM loglar WHERE tarih_saat IS ? AND mesaj = ? LIMIT 1", (satir[1], satir[6])).fetchone(): return
+            for kayitlar in self._dosya_kayitlari(ESKI_LOG_DOSYASI): self._ekle(c, kayitlar)
+
+    def farkli(self, sutun):
+        with contextlib.closing(self._baglanti()) as c:
+            return [r[0] for r in c.execute(f"SELECT DISTINCT {sutun} FROM loglar WHERE {sutun} IS NOT NULL ORDER BY {sutun}")]
+
+    def _kosullar(self, filtre):
+        kosullar, parametreler = [], []
+        if filtre.get("baslangic") is not None:
+            kosullar.append("ts >= ?")
+            parametreler.append(filtre["baslangic"])
+        if filtre.get("bitis") is not None:
+            kosullar.append("ts < ?")
+            parametreler.append(filtre["bitis"])
+        for sutun in ("kullanici", "tablo"):
+            if filtre.get(sutun):
+                kosullar.append(f"{sutun} = ?")
+                parametreler.append(filtre[sutun])
+        if filtre.get("islem_turleri"):
+            kosullar.append(f"islem_turu IN ({', '.join('?' * len(filtre['islem_turleri']))})")
+            parametreler.extend(filtre["islem_turleri"])
+        if filtre.get("metin"):
+            if self.fts:
+                kosullar.append("id IN (SELECT rowid FROM loglar_fts WHERE loglar_fts MATCH ?)")
+                parametreler.append(" ".join('"' + k.replace('"', '""') + '"' for k in filtre["metin"].split()))
+            else:
+                kosullar.append("mesaj LIKE ?")
+                parametreler.append(f"%{filtre['metin']}%")
+        return kosullar, parametreler
+
+    def sorgula(self, filtre, once_id=None, limit=50):
+        # En yeniden eskiye; imleç bir önceki sayfanın son id'sidir
+        kosullar, parametreler = self._kosullar(filtre)
+        if once_id is not None:
+            kosullar.append("id < ?")
+            parametreler.append(once_id)
+        sql = f"SELECT id, tarih_saat, kullanici, islem_turu, fonksiyon, tablo, mesaj, teknik_detay FROM loglar WHERE {' AND '.join(kosullar) or '1'} ORDER BY id DESC LIMIT ?"
+        with contextlib.closing(self._baglanti()) as c:
+            satirlar = c.execute(sql, parametreler + [limit + 1]).fetchall()
+        sonraki = satirlar[limit - 1][0] if len(satirlar) > limit else None
+        return [dict(zip(LOG_SUTUNLARI, r)) for r in satirlar[:limit]], sonraki
+
+    def akit(self, filtre, parca=1000):
+        kosullar, parametreler = self._kosullar(filtre)
+        sql = f"SELECT id, tarih_saat, kullanici, islem_turu, fonksiyon, tablo, mesaj, teknik_detay FROM loglar WHERE {' AND '.join(kosullar) or '1'} ORDER BY id DESC"
+        with contextlib.closing(self._baglanti()) as c:
+            imlec = c.execute(sql, parametreler)
+            while True:
+                satirlar = imlec.fetchmany(parca)
+                if not satirlar: return
+                yield from satirlar
+
+def satirlari_disa_aktar(yol, bicim, basliklar, satirlar, tipler=None):
+    # Satırlar tek tek akıtılır; Excel için xlsxwriter constant_memory kipi,
+    # Parquet için parça parça yazım kullanılır. tipler: sütun -> şema tipi
+    if bicim == "csv":
+        with open(yol, "w", newline="", encoding="utf-8-sig") as f:
+            yazici = csv.writer(f)
+            yazici.writerow(basliklar)
+            yazici.writerows(satirlar)
+    elif bicim == "parquet": _parquet_yaz(yol, basliklar, satirlar, tipler or {})
+    else:
+        import xlsxwriter
+        kitap = xlsxwriter.Workbook(yol, {"constant_memory": True, "remove_timezone": True, "default_date_format": "yyyy-mm-dd hh:mm"})
+        sayfa = kitap.add_worksheet()
+        sayfa.write_row(0, 0, basliklar)
+        for i, satir in enumerate(satirlar, 1): sayfa.write_row(i, 0, [_excel_hucresi(v) for v in satir])
+        kitap.close()
+    return yol
+
+def _excel_hucresi(deger):
+    if deger is None or isinstance(deger, (str, int, float, bool, datetime.date, datetime.time)): return deger
+    return str(deger)
+
+def parquet_destekli():
+    # pyarrow opsiyoneldir; yoksa Parquet seçeneği gösterilmez
+    import importlib.util
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _parquet_yaz(yol, basliklar, satirlar, tipler, parca=5000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pa_tipleri = {"sayi": pa.float64(), "tarih": pa.timestamp("us", tz="UTC"), "bool": pa.bool_()}
+    kontroller = {"sayi": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool), "tarih": lambda v: isinstance(v, datetime.datetime), "bool": lambda v: isinstance(v, bool)}
+    sutun_tipleri = [tipler.get(b) if tipler.get(b) in pa_tipleri else "metin" for b in basliklar]
+    sema = pa.schema([(str(b), pa_tipleri.get(tip, pa.string())) for b, tip in zip(basliklar, sutun_tipleri)])
+
+    def hucre(deger, tip):
+        if tip == "metin": return None if deger is None else deger if isinstance(deger, str) else str(deger)
+        deger = deger_donustur(deger, tip)
+        # Şemaya uymayan değer sütunun tipini bozmasın diye boş bırakılır
+        return deger if deger is not None and kontroller[tip](deger) else None
+
+    def tablo(tampon):
+        return pa.Table.from_pylist([{str(b): hucre(v, tip) for b, tip, v in zip(basliklar, sutun_tipleri, r)} for r in tampon], schema=sema)
+
+    with pq.ParquetWriter(yol, sema) as yazici:
+        tampon, yazildi = [], False
+        for satir in satirlar:
+            tampon.append(satir)
+            if len(tampon) == parca:
+                yazici.write_table(tablo(tampon))
+                tampon, yazildi = [], True
+        # Boş tabloda da şemalı geçerli bir dosya oluşur
+        if tampon or not yazildi: yazici.write_table(tablo(tampon))
+
+@st.cache_resource
+def get_log_deposu():
+    # Eski Excel logu indeks kurulmadan önce dönüştürülür; hangi yol önce
+    # açılırsa açılsın (log yazımı ya da Log Kayıtları) indekse girer
+    _eski_excel_logu_tasi()
+    depo = LogDeposu(LOG_VERITABANI)
+    depo.eski_logu_aktar()
+    return depo
+
+@st.cache_resource
+def get_log_yazici():
+    return LogYazici(LOG_DOSYASI, get_log_deposu())
+
+def log_dosyalari():
+    # Eskiden yeniye: döndürülmüş arşivler, en sonda aktif dosya
+    if not os.path.isdir(LOG_KLASORU): return []
+    aktif = os.path.basename(LOG_DOSYASI)
+    on_ek = aktif.replace(".jsonl", ".")
+    arsivler = sorted(os.path.join(LOG_KLASORU, f) for f in os.listdir(LOG_KLASORU) if f.startswith(on_ek) and f.endswith(".jsonl") and f != aktif)
+    return arsivler + ([LOG_DOSYASI] if os.path.exists(LOG_DOSYASI) else [])
+
+def log_kayit_ekle(islem_turu, fonksiyon_adi, mesaj, teknik_detay="-", tablo=None, kullanici=None):
+    # Arka plan işleri oturum dışında çalışır; kullanıcıyı kendileri verir
+    kullanici = kullanici or st.session_state.get("username", "System")
+    mesaj = f"[{kullanici}] {mesaj}"
+    simdi = datetime.datetime.now()
+    yeni_kayit = {"ts": simdi.timestamp(), "Tarih_Saat": simdi.strftime("%d.%m.%Y %H:%M:%S"), "Kullanıcı": kullanici, "İşlem_Türü": islem_turu, "Fonksiyon": fonksiyon_adi, "Tablo": tablo, "Mesaj": mesaj, "Teknik_Detay": teknik_detay}
+    try: get_log_yazici().yaz(yeni_kayit)
     except: pass
 
 # --- HELPERS ---
+SISTEM_KOLEKSIYONLARI = ["system_users", "system_settings", "transfer_loglari", "system_jobs", "system_rollups", "transfer_arsivi"]
+
 def get_table_list():
-    return [coll.id for coll in db.collections() if coll.id not in ["system_users", "system_settings", "transfer_loglari"]]
+    return get_katalog().tablolar()
 
-def get_locations():
-    doc = db.collection('system_settings').document('locations').get()
-    if doc.exists: return sorted(doc.to_dict().get('list', []))
+# --- YENİDEN ÇALIŞTIRMA ÖLÇÜMÜ ---
+# Her tam çalıştırma sayfa adıyla, her bölüm (fragment) çalıştırması bölüm adıyla
+# süreç içinde kaydedilir. Yönetici panelinde son ölçümlerin medyan / p95 değerleri
+# gösterilir; bir etkileşimin tüm sayfayı mı yoksa yalnızca bölümünü mü
+# çalıştırdığı buradan izlenir.
+OLCUM_PENCERESI = 200
+
+class RerunOlcer:
+    def __init__(self, pencere):
+        self.lock = threading.Lock()
+        self.olcumler = defaultdict(lambda: deque(maxlen=pencere))
+
+    def kaydet(self, ad, sure):
+        with self.lock: self.olcumler[ad].append(sure)
+
+    def ozet(self):
+        with self.lock: kopya = {ad: list(d) for ad, d in self.olcumler.items()}
+        satirlar = []
+        for ad, sureler in sorted(kopya.items()):
+            sirali = sorted(sureler)
+            satirlar.append({"Bölge": ad, "Çalıştırma": len(sirali),
+                             "Medyan (ms)": round(sirali[len(sirali) // 2] * 1000, 1),
+                             "p95 (ms)": round(sirali[min(len(sirali) - 1, int(len(sirali) * 0.95))] * 1000, 1),
+                             "Son (ms)": round(sureler[-1] * 1000, 1)})
+        return satirlar
+
+@st.cache_resource
+def get_rerun_olcer():
+    return RerunOlcer(OLCUM_PENCERESI)
+
+def olculen(ad):
+    # st.rerun / st.stop istisnayla çıktığı için süre finally içinde yazılır
+    def sarmala(fonk):
+        @functools.wraps(fonk)
+        def olcum(*args, **kwargs):
+            t0 = time.perf_counter()
+            try: return fonk(*args, **kwargs)
+            finally: get_rerun_olcer().kaydet(ad, time.perf_counter() - t0)
+        return olcum
+    return sarmala
+
+# --- KOLEKSİYON KATALOĞU ---
+# Makine tablolarının listesi ve kayıt sayıları süreç içinde tutulur; sayfa açmak
+# koleksiyon listeleme ya da tam tarama gerektirmez. Sayılar count() toplama
+# sorgusuyla okunur, uygulamanın yazma yolları invalidate_table() üzerinden
+# sayıları yerinde günceller. Dışarıdan yapılan değişiklikler yenileme süresi
+# dolunca görünür.
+KATALOG_YENILEME = 120  # saniye
+
+class Katalog:
+    def __init__(self, yenileme):
+        self.yenileme = yenileme
+        self._kilit = threading.Lock()
+        self._liste = None
+        self._liste_zamani = 0.0
+        self._sayilar = {}      # tablo -> (okuma zamanı, sayı)
+
+    def tablolar(self):
+        with self._kilit:
+            if self._liste is not None and time.time() - self._liste_zamani < self.yenileme: return list(self._liste)
+        liste = [coll.id for coll in db.collections() if coll.id not in SISTEM_KOLEKSIYONLARI]
+        with self._kilit:
+            self._liste, self._liste_zamani = liste, time.time()
+            # Listeden düşen tabloların sayıları da tutulmaz
+            for tablo in [k for k in self._sayilar if k not in liste]: del self._sayilar[tablo]
+        return list(liste)
+
+    def sayi(self, tablo):
+        with self._kilit:
+            kayit = self._sayilar.get(tablo)
+            if kayit and time.time() - kayit[0] < self.yenileme: return kayit[1]
+        n = int(db.collection(tablo).count().get()[0][0].value)
+        with self._kilit: self._sayilar[tablo] = (time.time(), n)
+        return n
+
+    def sayi_ekle(self, tablo, fark):
+        with self._kilit:
+            if tablo in self._sayilar:
+                zaman, n = self._sayilar[tablo]
+                self._sayilar[tablo] = (zaman, max(0, n + fark))
+            if fark > 0: self._listeye_ekle(tablo)
+
+    def dusur(self, tablo):
+        # Sayısı bilinmeyen toplu değişiklik: sayı bir sonraki istekte yeniden okunur
+        with self._kilit:
+            self._sayilar.pop(tablo, None)
+            self._listeye_ekle(tablo)
+
+    def tablo_silindi(self, tablo):
+        with self._kilit:
+            self._sayilar.pop(tablo, None)
+            if self._liste is not None and tablo in self._liste: self._liste.remove(tablo)
+
+    def yenile(self):
+        with self._kilit:
+            self._liste = None
+            self._sayilar.clear()
+
+    def _listeye_ekle(self, tablo):
+        if self._liste is not None and tablo not in self._liste and tablo not in SISTEM_KOLEKSIYONLARI:
+            self._liste = sorted(self._liste + [tablo])
+
+@st.cache_resource
+def get_katalog():
+    return Katalog(KATALOG_YENILEME)
+
+# --- TABLO ÖNBELLEĞİ ---
+# Tüm oturumların paylaştığı tablo anlık görüntüleri. Uygulamanın kendi yazma
+# yolları (ekle / güncelle / sil / transfer / yükle) ilgili tabloyu geçersiz kılar.
+TABLO_CACHE_TTL = 300   # saniye
+TABLO_CACHE_MAX = 8     # bellekte tutulan en fazla tablo sayısı
+
+class TabloCache:
+    def __init__(self, ttl, max_tablo):
+        self.ttl = ttl
+        self.max_tablo = max_tablo
+        self.lock = threading.Lock()
+        self.yukleme_kilitleri = defaultdict(threading.Lock)
+        self.kayitlar = OrderedDict()   # tablo -> (zaman, versiyon, df)
+        self.versiyonlar = {}
+
+    def _taze(self, tablo):
+        kayit = self.kayitlar.get(tablo)
+        if kayit and kayit[1] == self.versiyonlar.get(tablo, 0) and time.time() - kayit[0] < self.ttl:
+            self.kayitlar.move_to_end(tablo)
+            return kayit[2]
+        return None
+
+    def get(self, tablo, yukle):
+        with self.lock:
+            df = self._taze(tablo)
+            kilit = self.yukleme_kilitleri[tablo]
+        if df is not None: return df
+        # Aynı tabloyu aynı anda isteyen oturumlar tek bir okuma paylaşır
+        with kilit:
+            with self.lock:
+                df = self._taze(tablo)
+                versiyon = self.versiyonlar.get(tablo, 0)
+            if df is not None: return df
+            df = yukle()
+            with self.lock:
+                # Okuma sürerken bir yazma olduysa eski veriyi önbelleğe koyma
+                if self.versiyonlar.get(tablo, 0) == versiyon:
+                    self.kayitlar[tablo] = (time.time(), versiyon, df)
+                    self.kayitlar.move_to_end(tablo)
+                    while len(self.kayitlar) > self.max_tablo:
+                        self.kayitlar.popitem(last=False)
+            return df
+
+    def versiyon(self, tablo):
+        with self.lock:
+            return self.versiyonlar.get(tablo, 0)
+
+    def invalidate(self, tablo):
+        with self.lock:
+            self.versiyonlar[tablo] = self.versiyonlar.get(tablo, 0) + 1
+            self.kayitlar.pop(tablo, None)
+
+@st.cache_resource
+def get_tablo_cache():
+    return TabloCache(TABLO_CACHE_TTL, TABLO_CACHE_MAX)
+
+# Uygulamanın kendi kullandığı alanlar sayfalarda gösterilmez
+META_ALANLARI = {"_ozet"}
+
+def doc_satiri(doc):
+    return {"Dokuman_ID": doc.id, **{k: v for k, v in (doc.to_dict() or {}).items() if k not in META_ALANLARI}}
+
+def _tablo_oku(tablo):
+    data = [doc_satiri(doc) for doc in db.collection(tablo).stream()]
+    return pd.DataFrame(data)
+
+# --- CANLI TABLO AYNASI (OPSİYONEL) ---
+# ALMAXTEX_CANLI_AYNA=1 ile açılır. Açılan her tablo, on_snapshot dinleyicisiyle
+# süreç içinde aynalanır; yalnızca değişen dokümanlar bellekteki DataFrame'e
+# uygulanır. Referans olarak on_snapshot(callback) sunan her nesne kullanılabilir
+# (Firestore emülatörü veya bellek içi sahte koleksiyon).
+CANLI_AYNA = os.environ.get("ALMAXTEX_CANLI_AYNA", "0") == "1"
+CANLI_AYNA_MAX = 8          # aynı anda dinlenen en fazla tablo
+CANLI_AYNA_BEKLEME = 30     # ilk anlık görüntü için beklenecek saniye
+
+class TabloAyna:
+    def __init__(self, ref):
+        self.lock = threading.Lock()
+        self.hazir = threading.Event()
+        self.satirlar = {}      # doc_id -> satır
+        self.bekleyen = {}      # doc_id -> satır, silinenler için None
+        self.df = None
+        self.izleyici = ref.on_snapshot(self._degisiklik)
+
+    def _degisiklik(self, docs, changes, read_time):
+        with self.lock:
+            for ch in changes:
+                doc_id = ch.document.id
+                if ch.type.name == "REMOVED":
+                    self.satirlar.pop(doc_id, None)
+                    self.bekleyen[doc_id] = None
+                else:
+                    satir = doc_satiri(ch.document)
+                    self.satirlar[doc_id] = satir
+                    self.bekleyen[doc_id] = satir
+        self.hazir.set()
+
+    def _deltalari_uygula(self):
+        df = self.df
+        for doc_id, satir in self.bekleyen.items():
+            if satir is None:
+                df = df.drop(index=doc_id, errors='ignore')
+                continue
+            for k in satir:
+                if k not in df.columns: df[k] = None
+            df.loc[doc_id] = pd.Series(satir)
+        return df
+
+    def frame(self):
+        if not self.hazir.wait(CANLI_AYNA_BEKLEME): return None
+        with self.lock:
+            # Çok sayıda değişiklik birikmişse baştan kurmak daha ucuz
+            if self.df is None or len(self.bekleyen) > max(50, len(self.satirlar) // 10):
+                self.df = pd.DataFrame(list(self.satirlar.values()))
+                if not self.df.empty: self.df.index = self.df['Dokuman_ID'].values
+            elif self.bekleyen:
+                self.df = self._deltalari_uygula()
+            self.bekleyen = {}
+            return self.df.reset_index(drop=True)
+
+    def kapat(self):
+        try: self.izleyici.unsubscribe()
+        except: pass
+
+class AynaHavuzu:
+    def __init__(self, max_tablo):
+        self.max_tablo = max_tablo
+        self.lock = threading.Lock()
+        self.aynalar = OrderedDict()
+
+    def frame(self, tablo, ref):
+        with self.lock:
+            ayna = self.aynalar.get(tablo)
+            if ayna is None:
+                ayna = self.aynalar[tablo] = TabloAyna(ref)
+            self.aynalar.move_to_end(tablo)
+            while len(self.aynalar) > self.max_tablo:
+                self.aynalar.popitem(last=False)[1].kapat()
+        return ayna.frame()
+
+@st.cache_resource
+def get_ayna_havuzu():
+    return AynaHavuzu(CANLI_AYNA_MAX)
+
+def get_table_df(tablo):
+    if CANLI_AYNA:
+        df = get_ayna_havuzu().frame(tablo, db.collection(tablo))
+        if df is not None: return df
+    # Önbellekteki çerçeve paylaşıldığı için sayfalara kopyası verilir
+    return get_tablo_cache().get(tablo, lambda: _tablo_oku(tablo)).copy()
+
+def invalidate_table(tablo, degisenler=None, silinenler=None, eklenen=0):
+    # degisenler: {doc_id: {alan: değer}}, silinenler: [doc_id], eklenen: yeni
+    # doküman sayısı. Verilmezse arama indeksi düşürülür ve bir sonraki aramada
+    # yeniden kurulur; katalogdaki kayıt sayısı da yeniden okunur.
+    get_tablo_cache().invalidate(tablo)
+    if degisenler is None and silinenler is None:
+        get_arama_havuzu().dusur(tablo)
+        get_katalog().dusur(tablo)
     else:
-        defaults = ["Bursa", "Mısır", "Mardin", "İstanbul", "Depo"]
-        db.collection('system_settings').document('locations').set({'list': defaults})
-        return sorted(defaults)
+        get_arama_havuzu().guncelle(tablo, degisenler or {}, silinenler or [])
+        fark = eklenen - len(silinenler or [])
+        if fark: get_katalog().sayi_ekle(tablo, fark)
+
+# --- SORGU PLANLAYICI ---
+# Eşitlik, "in" ve önek filtreleri Firestore where/aralık sorgularına çevrilir;
+# yalnızca alt dize ("içerir") ve sunucuya sığmayan filtreler istemcide uygulanır.
+FILTRE_OPERATORLERI = {"eşittir": "==", "içinde (virgüllü)": "in", "ile başlar": "prefix", "içerir": "contains"}
+FS_IN_LIMIT = 30    # Firestore "in" sorgusundaki en fazla değer
+
+def sorgu_plani(tablo, filtreler):
+    sunucu, istemci = [], []
+    in_var, aralik_var = False, False
+    for sutun, op, deger in filtreler:
+        if op == "==": sunucu.append((sutun, op, deger))
+        elif op == "in" and not in_var and 0 < len(deger) <= FS_IN_LIMIT:
+            in_var = True
+            sunucu.append((sutun, op, deger))
+        elif op == "prefix" and not aralik_var:
+            # Firestore tek sorguda tek alan üzerinde aralık filtresi kabul eder
+            aralik_var = True
+            sunucu.append((sutun, op, deger))
+        else: istemci.append((sutun, op, deger))
+    # Eşitlikler önce, aralık alanı en sonda olacak şekilde bileşik indeks tanımı
+    alanlar = list(dict.fromkeys(a for a, o, _ in sorted(sunucu, key=lambda f: f[1] == "prefix")))
+    indeksler = []
+    if len(alanlar) > 1:
+        indeksler.append({"collectionGroup": tablo, "queryScope": "COLLECTION", "fields": [{"fieldPath": FieldPath(a).to_api_repr(), "order": "ASCENDING"} for a in alanlar]})
+    return {"sunucu": sunucu, "istemci": istemci, "indeksler": indeksler}
+
+def sorgu_olustur(tablo, sunucu):
+    q = db.collection(tablo)
+    for sutun, op, deger in sunucu:
+        alan = FieldPath(sutun).to_api_repr()
+        if op == "prefix":
+            q = q.where(filter=firestore.FieldFilter(alan, ">=", deger)).where(filter=firestore.FieldFilter(alan, "<", deger + "\uf8ff"))
+        else: q = q.where(filter=firestore.FieldFilter(alan, op, deger))
+    return q
+
+def _sorgu_oku(tablo, sunucu):
+    return pd.DataFrame([doc_satiri(doc) for doc in sorgu_olustur(tablo, sunucu).stream()])
+
+def sorgu_calistir(tablo, plan):
+    anahtar = (tablo, get_tablo_cache().versiyon(tablo), "sorgu", repr(plan["sunucu"]))
+    df = get_sayfa_cache().get(anahtar, lambda: _sorgu_oku(tablo, plan["sunucu"])).copy()
+    return filtre_uygula(df, plan["istemci"])
+
+def filtre_uygula(df, filtreler):
+    for sutun, op, deger in filtreler:
+        if df.empty: break
+        if sutun not in df.columns: return df.iloc[0:0]
+        seri = df[sutun].where(df[sutun].notna(), "").astype(str)
+        if op == "==": df = df[seri == str(deger)]
+        elif op == "in": df = df[seri.isin([str(d) for d in deger])]
+        elif op == "prefix": df = df[seri.str.startswith(deger)]
+        else: df = df[seri.str.lower().str.contains(str(deger).lower(), regex=False)]
+    return df
+
+def sorgu_sayisi(tablo, sunucu):
+    anahtar = (tablo, get_tablo_cache().versiyon(tablo), "sayi", repr(sunucu))
+    return get_sayfa_cache().get(anahtar, lambda: int(sorgu_olustur(tablo, sunucu).count().get()[0][0].value))
+
+def sorgu_ornegi(tablo, sunucu, limit):
+    anahtar = (tablo, get_tablo_cache().versiyon(tablo), "ornek", repr(sunucu), limit)
+    return get_sayfa_cache().get(anahtar, lambda: pd.DataFrame([doc_satiri(doc) for doc in sorgu_olustur(tablo, sunucu).limit(limit).stream()])).copy()
+
+def sorgu_eslesenleri(tablo, sunucu, alanlar):
+    # Eşleşen tüm dokümanların yalnızca istenen alanları (projeksiyon)
+    anahtar = (tablo, get_tablo_cache().versiyon(tablo), "eslesen", repr(sunucu), tuple(alanlar))
+
+    def oku():
+        q = sorgu_olustur(tablo, sunucu).select([FieldPath(a).to_api_repr() for a in alanlar])
+        return [{"Dokuman_ID": doc.id, **{a: (doc.to_dict() or {}).get(a) for a in alanlar}} for doc in q.stream()]
+    return get_sayfa_cache().get(anahtar, oku)
+
+def metin_filtrele(df, sutunlar, terimler, hepsi=True, tam_kelime=False):
+    # Küçük alt kümeler için indekssiz arama; SutunIndeksi ile aynı anlamı taşır.
+    # Değerler indeksteki gibi Python str() / str.lower() ile çevrilir: pandas'ın
+    # Arrow metin tipi "İ" harfini farklı küçültür ve tarihleri farklı yazar.
+    maske = None
+    for terim in terimler:
+        terim = terim.lower()
+        m = pd.Series(False, index=df.index)
+        for sutun in sutunlar:
+            if sutun not in df.columns: continue
+            seri = df[sutun].map(lambda v: "" if _bos_mu(v) else str(v).lower()).astype(object)
+            m |= seri.map(lambda s: terim in s.split()) if tam_kelime else seri.map(lambda s: terim in s)
+        maske = m if maske is None else ((maske & m) if hepsi else (maske | m))
+    return df if maske is None else df[maske]
+
+# --- ARAMA İNDEKSİ ---
+# Arama & Filtreleme için tablo başına kelime + n-gram (1-3) indeksi. Sütunlar ilk
+# arandıklarında anlık görüntüden kurulur, yazma yollarından gelen değişikliklerle
+# güncel tutulur.
+ARAMA_SUTUNLARI = ["Seri No", "Kullanıcı", "Kullanıcı PC Adı", "Departman"]
+
+def _bos_mu(deger):
+    try: return deger is None or bool(pd.isna(deger))
+    except (TypeError, ValueError): return False
+
+class SutunIndeksi:
+    # Anahtarlar tablo indeksinin verdiği tamsayı slotlardır; küme işlemleri hızlı kalır
+    def __init__(self):
+        self.degerler = {}                  # slot -> küçük harfli değer
+        self.gramlar = defaultdict(set)     # 1-3 karakterlik parça -> slot kümesi
+        self.kelimeler = defaultdict(set)   # kelime -> slot kümesi
+
+    @staticmethod
+    def _gramlar(deger):
+        return {deger[i:i + n] for n in (1, 2, 3) for i in range(len(deger) - n + 1)}
+
+    def ekle(self, doc_id, deger):
+        self.sil(doc_id)
+        if _bos_mu(deger): return
+        deger = str(deger).lower()
+        self.degerler[doc_id] = deger
+        for g in self._gramlar(deger): self.gramlar[g].add(doc_id)
+        for k in deger.split(): self.kelimeler[k].add(doc_id)
+
+    def sil(self, doc_id):
+        deger = self.degerler.pop(doc_id, None)
+        if deger is None: return
+        for postalar, anahtarlar in ((self.gramlar, self._gramlar(deger)), (self.kelimeler, deger.split())):
+            for a in anahtarlar:
+                ids = postalar.get(a)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids: del postalar[a]
+
+    def kelime(self, terim):
+        return set(self.kelimeler.get(str(terim).lower(), ()))
+
+    def ara(self, terim):
+        terim = str(terim).lower()
+        # 3 karaktere kadar terimler doğrudan tek bir posta listesidir
+        if len(terim) <= 3: return set(self.gramlar.get(terim, ()))
+        # En seyrek trigramın adayları gerçek alt dizeyle doğrulanır
+        adaylar = min((self.gramlar.get(terim[i:i + 3], ()) for i in range(len(terim) - 2)), key=len)
+        return {d for d in adaylar if terim in self.degerler[d]}
+
+class TabloIndeksi:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sutunlar = {}
+        self.slotlar = {}   # doc_id -> slot
+        self.idler = []     # slot -> doc_id
+
+    def _slot(self, doc_id):
+        slot = self.slotlar.get(doc_id)
+        if slot is None:
+            slot = self.slotlar[doc_id] = len(self.idler)
+            self.idler.append(doc_id)
+        return slot
+
+    def _sutun(self, df, sutun):
+        if sutun not in self.sutunlar:
+            indeks = SutunIndeksi()
+            if sutun in df.columns:
+                for doc_id, deger in zip(df['Dokuman_ID'], df[sutun]): indeks.ekle(self._slot(doc_id), deger)
+            self.sutunlar[sutun] = indeks
+        return self.sutunlar[sutun]
+
+    def sorgula(self, df, sutunlar, terimler, hepsi=True, tam_kelime=False):
+        # Her terim seçili sütunlardan herhangi birinde aranır; terimler VE / VEYA ile birleşir
+        sonuc = None
+        with self.lock:
+            for terim in terimler:
+                eslesen = set()
+                for sutun in sutunlar:
+                    indeks = self._sutun(df, sutun)
+                    eslesen |= indeks.kelime(terim) if tam_kelime else indeks.ara(terim)
+                if sonuc is None: sonuc = eslesen
+                else: sonuc = (sonuc & eslesen) if hepsi else (sonuc | eslesen)
+            return {self.idler[slot] for slot in sonuc or ()}
+
+    def guncelle(self, degisenler, silinenler):
+        with self.lock:
+            for sutun, indeks in self.sutunlar.items():
+                for doc_id in silinenler: indeks.sil(self._slot(doc_id))
+                for doc_id, alanlar in degisenler.items():
+                    if sutun in alanlar: indeks.ekle(self._slot(doc_id), alanlar[sutun])
+
+class AramaHavuzu:
+    def __init__(self, ttl, max_tablo):
+        self.ttl = ttl
+        self.max_tablo = max_tablo
+        self.lock = threading.Lock()
+        self.indeksler = OrderedDict()  # tablo -> (zaman, TabloIndeksi)
+
+    def get(self, tablo):
+        with self.lock:
+            kayit = self.indeksler.get(tablo)
+            # Dış yazmaları da yakalamak için indeks TTL sonunda yeniden kurulur
+            if kayit is None or time.time() - kayit[0] > self.ttl:
+                kayit = self.indeksler[tablo] = (time.time(), TabloIndeksi())
+                while len(self.indeksler) > self.max_tablo:
+                    self.indeksler.popitem(last=False)
+            self.indeksler.move_to_end(tablo)
+            return kayit[1]
+
+    def guncelle(self, tablo, degisenler, silinenler):
+        with self.lock:
+            kayit = self.indeksler.get(tablo)
+        if kayit: kayit[1].guncelle(degisenler, silinenler)
+
+    def dusur(self, tablo):
+        with self.lock:
+            self.indeksler.pop(tablo, None)
+
+@st.cache_resource
+def get_arama_havuzu():
+    return AramaHavuzu(TABLO_CACHE_TTL, TABLO_CACHE_MAX)
+
+def arama_benchmark(df, sutun, terim, hedef_satir=100_000, tekrar=20):
+    # İndeks ile eski str.contains taramasını aynı veri üzerinde karşılaştırır
+    if len(df) < hedef_satir:
+        df = pd.concat([df] * -(-hedef_satir // len(df)), ignore_index=True).head(hedef_satir)
+        df['Dokuman_ID'] = [f"b{i}" for i in range(len(df))]
+    t0 = time.perf_counter()
+    for _ in range(tekrar): tarama = df[df[sutun].astype(str).str.contains(terim, case=False, na=False, regex=False)]
+    sure_tarama = (time.perf_counter() - t0) / tekrar
+    t0 = time.perf_counter()
+    indeks = SutunIndeksi()
+    for slot, deger in enumerate(df[sutun]): indeks.ekle(slot, deger)
+    sure_kurulum = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(tekrar): ids = indeks.ara(terim)
+    sure_indeks = (time.perf_counter() - t0) / tekrar
+    return {"Satır": len(df), "str.contains (ms)": round(sure_tarama * 1000, 2), "İndeks sorgu (ms)": round(sure_indeks * 1000, 3), "İndeks kurulum (s)": round(sure_kurulum, 2), "Sonuç (tarama)": len(tarama), "Sonuç (indeks)": len(ids)}
+
+# --- TOPLU YAZMA ---
+# Tüm toplu yazma yolları için ortak motor: işlemler 500'lük write batch'lerle
+# gönderilir, geçici hatalarda üstel geri çekilme ile yeniden denenir.
+FS_BATCH_LIMIT = 500
+OZET_PAYI = 2           # özet farkı taşıyan batch'lerde özet dokümanlarına ayrılan yer
+OZETLI_BATCH = FS_BATCH_LIMIT - OZET_PAYI
+YAZMA_DENEME = 5
+GECICI_HATALAR = (gcp_exceptions.Aborted, gcp_exceptions.DeadlineExceeded, gcp_exceptions.ServiceUnavailable, gcp_exceptions.ResourceExhausted, gcp_exceptions.InternalServerError)
+
+def yeniden_dene(is_, deneme=YAZMA_DENEME):
+    for i in range(deneme):
+        try: return is_()
+        except GECICI_HATALAR:
+            if i == deneme - 1: raise
+            time.sleep(min(0.5 * 2 ** i, 8) + random.random() * 0.25)
+
+def _batch_commit(islemler):
+    # islemler: (tür, ref, veri[, özet farkı]) - tür: set / merge / update / delete.
+    # Özet farkı taşıyan işlemler veri tablolarına yazar; kısmi yazımlar yüklemenin
+    # içerik özetini (_ozet) siler, sonraki yükleme satırı değişmemiş saymaz.
+    batch = db.batch()
+    ozetler = defaultdict(lambda: defaultdict(int))
+    for tur, ref, veri, *fark in islemler:
+        if fark and tur in ("merge", "update"): veri = {**veri, "_ozet": firestore.DELETE_FIELD}
+        if tur == "set": batch.set(ref, veri)
+        elif tur == "merge": batch.set(ref, veri, merge=True)
+        elif tur == "update": batch.update(ref, veri)
+        else: batch.delete(ref)
+        if fark and fark[0]:
+            for k, n in fark[0].items(): ozetler[ref.parent.id][k] += n
+    # Özet sayımları dokümanlarla aynı batch'te, tablo başına tek yazımla güncellenir
+    for tablo, farklar in ozetler.items():
+        farklar = {k: n for k, n in farklar.items() if n}
+        if farklar: batch.set(db.collection(OZET_KOLEKSIYONU).document(tablo), _ozet_yazimi(farklar), merge=True)
+    batch.commit()
+
+def toplu_yaz(islemler, ilerleme=None, boyut=FS_BATCH_LIMIT):
+    if any(len(i) > 3 for i in islemler): boyut = min(boyut, OZETLI_BATCH)
+    toplam, yazilan = len(islemler), 0
+    for i in range(0, toplam, boyut):
+        parca = islemler[i:i + boyut]
+        yeniden_dene(lambda: _batch_commit(parca))
+        yazilan += len(parca)
+        if ilerleme: ilerleme(yazilan, toplam)
+    return yazilan
+
+def gruplari_yaz(gruplar, ilerleme=None, boyut=OZETLI_BATCH):
+    # Her grup (ör. makine güncellemesi + transfer kaydı) bölünmeden aynı batch'e girer
+    batchler, parca, n = [], [], 0
+    for grup in gruplar:
+        if parca and len(parca) + len(grup) > boyut:
+            batchler.append((parca, n))
+            parca, n = [], 0
+        parca.extend(grup)
+        n += 1
+    if parca: batchler.append((parca, n))
+    yazilan = 0
+    for parca, n in batchler:
+        yeniden_dene(lambda: _batch_commit(parca))
+        yazilan += n
+        if ilerleme: ilerleme(yazilan, len(gruplar))
+    return len(batchler)
+
+def fs_deger(deger):
+    # pandas / numpy değerlerini Firestore'un kabul ettiği tiplere çevirir
+    if _bos_mu(deger): return None
+    if isinstance(deger, pd.Timestamp): return deger.to_pydatetime()
+    if hasattr(deger, "item"): return deger.item()
+    return deger
+
+def satir_farklari(orijinal, duzenlenen):
+    # Düzenlenen çerçevede yalnızca değişen satır/alanlar: {doc_id: {alan: yeni_değer}}
+    o = orijinal.set_index('Dokuman_ID')
+    d = duzenlenen.set_index('Dokuman_ID')
+    ortak = [c for c in d.columns if c in o.columns]
+    o = o.loc[d.index, ortak]
+    d = d[ortak]
+    degisti = ~((o == d) | (o.isna() & d.isna()))
+    farklar = {}
+    for doc_id, satir in degisti[degisti.any(axis=1)].iterrows():
+        farklar[doc_id] = {c: fs_deger(d.at[doc_id, c]) for c in satir.index[satir.values]}
+    return farklar
+
+# --- ÖZET SAYIMLAR ---
+# Raporlar sayfası tablo başına tek bir özet dokümanından (system_rollups/{tablo})
+# çizilir: toplam kayıt ve OZET_SUTUNLARI'nda değer başına kayıt sayısı. Yazma
+# işlemleri kendi özet farkını taşır (bkz. _batch_commit); farklar Increment ile
+# aynı batch'te uygulanır. Dış kaynaklı değişiklikler için tam yeniden kurma var.
+OZET_KOLEKSIYONU = "system_rollups"
+OZET_SUTUNLARI = ["Lokasyon", "Departman", "Versiyon", "Son Durum"]
+OZET_SURUMU = 1
+OZET_PARCA = 1000
+
+def ozet_anahtari(deger):
+    # Rapordaki eski fillna("-") davranışıyla aynı: boş değerler "-" altında sayılır
+    if deger is firestore.DELETE_FIELD or _bos_mu(deger): return "-"
+    if isinstance(deger, float) and deger.is_integer(): deger = int(deger)
+    anahtar = str(deger).strip()[:200] or "-"
+    # Firestore __x__ biçimindeki alan adlarını kabul etmez
+    return "_" + anahtar if anahtar.startswith("__") and anahtar.endswith("__") else anahtar
+
+def ozet_farki(eski, yeni):
+    # eski / yeni: dokümanın yazmadan önceki ve sonraki hali (yoksa None).
+    # Sonuç {None: toplam farkı, (sütun, değer): fark}
+    fark = defaultdict(int)
+    for satir, n in ((eski, -1), (yeni, 1)):
+        if satir is None: continue
+        fark[None] += n
+        for sutun in OZET_SUTUNLARI: fark[(sutun, ozet_anahtari(satir.get(sutun)))] += n
+    return {k: n for k, n in fark.items() if n}
+
+def _ozet_yazimi(farklar):
+    veri = {"sayimlar": {}, "guncelleme": firestore.SERVER_TIMESTAMP}
+    for k, n in farklar.items():
+        if k is None: veri["toplam"] = firestore.Increment(n)
+        else: veri["sayimlar"].setdefault(k[0], {})[k[1]] = firestore.Increment(n)
+    return veri
+
+def ozet_oku(tablo):
+    doc = db.collection(OZET_KOLEKSIYONU).document(tablo).get()
+    return doc.to_dict() if doc.exists else None
+
+def ozet_sil(tablo):
+    db.collection(OZET_KOLEKSIYONU).document(tablo).delete()
+
+def ozet_yeniden_kur(tablo, ilerleme=None):
+    # Tek seferlik tam tarama; yalnızca özet sütunları okunur (projeksiyon).
+    # Sonuç set ile yazılır: tarama sürerken başka yazmaların uyguladığı
+    # Increment'lar bu yazımla ezilir. Yoğun yazma yokken kurulmalıdır.
+    farklar, son_id, okunan = defaultdict(int), None, 0
+    alanlar = [FieldPath(s).to_api_repr() for s in OZET_SUTUNLARI]
+    while True:
+        q = db.collection(tablo).select(alanlar).order_by(FieldPath.document_id()).limit(OZET_PARCA)
+        if son_id: q = q.start_after({FieldPath.document_id(): son_id})
+        docs = list(yeniden_dene(lambda: list(q.stream())))
+        for doc in docs:
+            for k, n in ozet_farki(None, doc.to_dict() or {}).items(): farklar[k] += n
+        okunan += len(docs)
+        if ilerleme: ilerleme(okunan)
+        if len(docs) < OZET_PARCA: break
+        son_id = docs[-1].id
+    veri = {"toplam": farklar.pop(None, 0), "sayimlar": {}, "surum": OZET_SURUMU, "kurulum": firestore.SERVER_TIMESTAMP, "guncelleme": firestore.SERVER_TIMESTAMP}
+    for sutun in OZET_SUTUNLARI: veri["sayimlar"][sutun] = {}
+    for (sutun, anahtar), n in farklar.items(): veri["sayimlar"][sutun][anahtar] = n
+    db.collection(OZET_KOLEKSIYONU).document(tablo).set(veri)
+    return okunan
+
+def ozet_serisi(ozet, sutun):
+    # Sıfıra inen değerler dokümanda kalır; grafikte gösterilmez
+    sayimlar = {k: n for k, n in ((ozet or {}).get("sayimlar", {}).get(sutun) or {}).items() if n > 0}
+    return pd.Series(sayimlar, dtype="int64").sort_values(ascending=False)
+
+# --- TOPLU SİLME ---
+# Referanslar yalnızca doküman adı okunarak (__name__ projeksiyonu) parça parça
+# akıtılır ve sınırlı eşzamanlılıkla batch'ler halinde silinir. Sırayla kapanan
+# her parçadan sonra kontrol noktası (silinen, son_id) çağırana bildirilir; tablo
+# silme işi bunu system_jobs'a yazar ve kaldığı yerden devam eder.
+SILME_PARCA = FS_BATCH_LIMIT
+SILME_ESZAMANLI = 4
+SILME_IS_ESIGI = 1000   # bundan fazla kayıt seçilirse silme arka plan işi olarak çalışır
+
+def referanslari_akit(tablo, son_id=None, parca=SILME_PARCA):
+    while True:
+        q = db.collection(tablo).select([FieldPath.document_id()]).order_by(FieldPath.document_id()).limit(parca)
+        if son_id: q = q.start_after({FieldPath.document_id(): son_id})
+        refs = [doc.reference for doc in q.stream()]
+        if not refs: return
+        yield refs
+        if len(refs) < parca: return
+        son_id = refs[-1].id
+
+def toplu_sil(parcalar, kontrol_noktasi=None, ilerleme=None, baslangic=0, eszamanli=SILME_ESZAMANLI, ozet_farklari=None):
+    # ozet_farklari: {doc_id: özet farkı}; verilirse silmelerle aynı batch'te uygulanır
+    from concurrent.futures import ThreadPoolExecutor
+    silinen, son_id, t0 = baslangic, None, time.perf_counter()
+    kuyruk = deque()
+
+    def tamamla(bildir=True):
+        # Parçalar gönderildikleri sırayla kapatılır; kontrol noktası hep güvenli kalır
+        nonlocal silinen, son_id
+        refs, fut = kuyruk.popleft()
+        fut.result()
+        silinen += len(refs)
+        son_id = refs[-1].id
+        if kontrol_noktasi: kontrol_noktasi(silinen, son_id)
+        if ilerleme and bildir: ilerleme(silinen, (silinen - baslangic) / max(time.perf_counter() - t0, 1e-6))
+
+    with ThreadPoolExecutor(max_workers=eszamanli) as havuz:
+        try:
+            for refs in parcalar:
+                kuyruk.append((refs, havuz.submit(toplu_yaz, [("delete", r, None, (ozet_farklari or {}).get(r.id)) for r in refs])))
+                while kuyruk and (len(kuyruk) >= eszamanli or kuyruk[0][1].done()): tamamla()
+        except BaseException:
+            # İptal ya da hata: gönderilmiş parçalar beklenir, kontrol noktası silinenleri kapsar
+            while kuyruk:
+                try: tamamla(bildir=False)
+                except Exception: break
+            raise
+        while kuyruk: tamamla()
+    return silinen, (silinen - baslangic) / max(time.perf_counter() - t0, 1e-6)
+
+# --- MAKİNE TRANSFERİ ---
+# Her makinenin lokasyon güncellemesi ve transfer kaydı aynı batch'te commit
+# edilir (makine başına 2 işlem, batch başına 249 makine ve özet dokümanı). Kayıt ID'leri
+# gönderim (iş) kapsamında deterministiktir; aynı gönderim tekrar çalıştırılırsa
+# çift kayıt oluşmaz, aynı tarihlerle yapılan yeni bir transfer ise yeni kayıt açar.
+def transfer_anahtari(kimlik, tablo, makine_id, hedef, gonderim, geri_alim):
+    return hashlib.sha1(f"{kimlik}|{tablo}|{makine_id}|{hedef}|{gonderim}|{geri_alim}".encode()).hexdigest()[:24]
+
+def makine_transfer(tablo, makineler, hedef, gonderim, geri_alim, ilerleme=None, kullanici=None, baslangic=0, kimlik=None):
+    # makineler: Dokuman_ID, Seri No ve Lokasyon içeren satırlar. baslangic: önceki
+    # çalıştırmada yazılmış işlem sayısı; devam eden iş bu işlemleri tekrar yazmaz.
+    # kimlik: gönderimin kimliği (iş ID'si); verilmezse her çağrı ayrı gönderimdir.
+    kimlik, islemler = kimlik or os.urandom(8).hex(), []
+    for m in makineler:
+        kayit = {
+            "Makine_ID": m['Dokuman_ID'],
+            "Makine_Info": fs_deger(m.get('Seri No')) or m['Dokuman_ID'],
+            "Tablo": tablo,
+            "Hedef_Lokasyon": hedef,
+            "Gonderim_Tarihi": str(gonderim),
+            "Geri_Alim_Tarihi": str(geri_alim),
+            "Transfer_Eden": kullanici or st.session_state["username"],
+            "Durum": TRANSFER_ACIK
+        }
+        # Tekrar çalıştırmada makine zaten hedefte; ilk kaynağın üzerine yazılmaz
+        if m.get('Lokasyon') != hedef: kayit["Kaynak_Lokasyon"] = fs_deger(m.get('Lokasyon'))
+        kayit = semayi_uygula(get_sema('transfer_loglari'), kayit)
+        log_id = transfer_anahtari(kimlik, tablo, m['Dokuman_ID'], hedef, gonderim, geri_alim)
+        islemler.append(("update", db.collection(tablo).document(m['Dokuman_ID']), {"Lokasyon": hedef}, ozet_farki(m, {**m, "Lokasyon": hedef})))
+        islemler.append(("merge", db.collection('transfer_loglari').document(log_id), kayit))
+    t0 = time.perf_counter()
+    toplu_yaz(islemler[baslangic:], ilerleme and (lambda n, toplam: ilerleme(baslangic + n, len(islemler))))
+    sure = time.perf_counter() - t0
+    return {"makine": len(makineler), "commit": -(-len(islemler) // OZETLI_BATCH), "eski_rpc": len(islemler), "sure": sure}
+
+# Seri No listesiyle toplu transfer: liste 30'luk "in" sorgularıyla eşzamanlı
+# çözülür, yalnızca Seri No ve Lokasyon okunur; tablo tarayıcıya gönderilmez.
+SERI_COZME_ESZAMANLI = 8
+
+def seri_listesi_ayristir(metin):
+    # Satır, virgül, noktalı virgül ya da sekmeyle ayrılmış; tekrarlar atılır, sıra korunur
+    return list(dict.fromkeys(p.strip() for p in re.split(r"[\r\n,;\t]+", metin or "") if p.strip()))
+
+def seri_dosyasi_oku(dosya):
+    if not dosya.name.lower().endswith((".xlsx", ".xls")):
+        return [s for s in seri_listesi_ayristir(dosya.getvalue().decode("utf-8-sig", errors="ignore")) if s.lower() != "seri no"]
+    seriler = []
+    for _, basliklar, satirlar in excel_sayfalari(dosya):
+        sira = next((i for i, b in enumerate(basliklar) if str(b).strip() == "Seri No"), None)
+        # "Seri No" başlığı yoksa ilk sütun kullanılır ve ilk satır da veridir
+        if sira is None: sira, satirlar = 0, [basliklar, *satirlar]
+        for satir in satirlar:
+            deger = deger_donustur(satir[sira], "metin") if sira < len(satir) else None
+            if deger and deger.strip(): seriler.append(deger.strip())
+        break
+    return list(dict.fromkeys(seriler))
+
+def seri_nolari_coz(tablo, seriler, eszamanli=SERI_COZME_ESZAMANLI):
+    # (makineler, bulunamayanlar, birden fazla eşleşenler). Sayı olarak saklanmış
+    # seri numaraları da eşleşsin diye rakamdan oluşan değerler iki tipte aranır.
+    from concurrent.futures import ThreadPoolExecutor
+    adaylar = []
+    for seri in seriler:
+        adaylar.append(seri)
+        if seri.isdigit() and (seri == "0" or not seri.startswith("0")): adaylar.append(int(seri))
+    alan = FieldPath("Seri No").to_api_repr()
+
+    def oku(parca):
+        q = db.collection(tablo).where(filter=firestore.FieldFilter(alan, "in", parca)).select([alan, "Lokasyon"])
+        return yeniden_dene(lambda: list(q.stream()))
+
+    eslesen = defaultdict(dict)
+    with ThreadPoolExecutor(max_workers=eszamanli) as havuz:
+        for docs in havuz.map(oku, [adaylar[i:i + FS_IN_LIMIT] for i in range(0, len(adaylar), FS_IN_LIMIT)]):
+            for doc in docs:
+                veri = doc.to_dict() or {}
+                eslesen[deger_donustur(veri.get("Seri No"), "metin")][doc.id] = {"Dokuman_ID": doc.id, "Seri No": veri.get("Seri No"), "Lokasyon": veri.get("Lokasyon")}
+    makineler = [m for seri in seriler for m in eslesen.get(seri, {}).values()]
+    return makineler, [s for s in seriler if s not in eslesen], [s for s in seriler if len(eslesen.get(s, {})) > 1]
+
+# --- TRANSFER UYARILARI ---
+# Geciken / yaklaşan iadeler açık transferler üzerinde aralık sorgusuyla bulunur
+# (Durum + Geri_Alim_Tarihi bileşik indeksi, bkz. firestore.indexes.json).
+# Günlük uyarı özeti tek dokümanda tutulur; günün ilk ziyaretinde, her
+# transferden sonra ve elle yenilemede yeniden hesaplanır. Banner tek okumadır.
+TRANSFER_ACIK = "açık"
+TRANSFER_IADE = "iade"
+TRANSFER_ARSIV = "arşiv"
+YAKLASAN_GUN = 3
+UYARI_DETAY_MAX = 50
+ACIK_TRANSFER_MAX = 1000
+
+def _gun_baslangici(gun):
+    # Tarihler saatsiz (UTC gece yarısı) saklanır; sınırlar da aynı biçimde verilir
+    return datetime.datetime.combine(gun, datetime.time())
+
+def acik_transfer_sorgusu(bas=None, bit=None):
+    # bas <= Geri_Alim_Tarihi < bit olan açık transferler
+    q = db.collection('transfer_loglari').where(filter=firestore.FieldFilter("Durum", "==", TRANSFER_ACIK))
+    if bas: q = q.where(filter=firestore.FieldFilter("Geri_Alim_Tarihi", ">=", _gun_baslangici(bas)))
+    if bit: q = q.where(filter=firestore.FieldFilter("Geri_Alim_Tarihi", "<", _gun_baslangici(bit)))
+    return q.order_by("Geri_Alim_Tarihi")
+
+def _uyari_satiri(doc):
+    veri = doc.to_dict() or {}
+    return {"Transfer_ID": doc.id, **{k: veri.get(k) for k in ("Makine_Info", "Tablo", "Hedef_Lokasyon", "Geri_Alim_Tarihi")}}
+
+def uyari_ozeti_olustur(bugun=None):
+    bugun = bugun or datetime.date.today()
+    gecikme = acik_transfer_sorgusu(bit=bugun)
+    yaklasan = acik_transfer_sorgusu(bugun + datetime.timedelta(days=1), bugun + datetime.timedelta(days=YAKLASAN_GUN + 1))
+    ozet = {
+        "gun": str(bugun),
+        "geciken": int(gecikme.count().get()[0][0].value),
+        "yaklasan": int(yaklasan.count().get()[0][0].value),
+        "gecikenler": [_uyari_satiri(d) for d in gecikme.limit(UYARI_DETAY_MAX).stream()],
+        "yaklasanlar": [_uyari_satiri(d) for d in yaklasan.limit(UYARI_DETAY_MAX).stream()],
+        "olusturma": datetime.datetime.now()
+    }
+    get_ayar_defteri().yaz('transfer_uyarilari', ozet)
+    return ozet
+
+@st.cache_resource
+def _uyari_kilidi():
+    return threading.Lock()
+
+def get_uyari_ozeti():
+    ozet = get_ayar_defteri().get('transfer_uyarilari')
+    if ozet and ozet.get("gun") == str(datetime.date.today()): return ozet
+    # Günün ilk isteği özeti kurar; aynı anda gelen oturumlar bekler. Başka bir
+    # süreç kurmuş olabileceğinden kilit içinde önbellek atlanır.
+    with _uyari_kilidi():
+        ozet = get_ayar_defteri().get('transfer_uyarilari', taze=True)
+        if ozet and ozet.get("gun") == str(datetime.date.today()): return ozet
+        # Günlük bakım: iadesi tamamlanmış kayıtlar arka planda arşive taşınır
+        arsivlemeyi_baslat()
+        return uyari_ozeti_olustur()
+
+def acik_transferler(limit=ACIK_TRANSFER_MAX):
+    return [doc_satiri(d) for d in acik_transfer_sorgusu().limit(limit).stream()]
+
+def transfer_kayitlarini_donustur(ilerleme=None):
+    # Tek seferlik: metin tarihleri zaman damgasına çevrilir, Durum'u olmayan
+    # eski kayıtlar açık sayılır (önceki sürümde iade akışı yoktu)
+    sema, islemler = get_sema('transfer_loglari'), []
+    for doc in dokumanlari_akit('transfer_loglari'):
+        veri = doc.to_dict() or {}
+        tarihler = semayi_uygula(sema, {k: veri[k] for k in ("Gonderim_Tarihi", "Geri_Alim_Tarihi") if k in veri})
+        degisen = {k: v for k, v in tarihler.items() if v != veri.get(k)}
+        if "Durum" not in veri: degisen["Durum"] = TRANSFER_ACIK
+        if degisen: islemler.append(("update", doc.reference, degisen))
+    toplu_yaz(islemler, ilerleme)
+    return len(islemler)
+
+# --- TRANSFER YAŞAM DÖNGÜSÜ ---
+# açık -> iade -> arşiv. İadede makine kaynak lokasyonuna döner; makine ve
+# transfer kaydı aynı batch'te güncellenir. İadesinden ARSIV_BEKLEME_GUN geçen
+# kayıtlar arka planda aylık bölümlere taşınır:
+#   transfer_arsivi/{YYYY-AA}/arsiv_transferleri/{transfer_id}
+# Böylece transfer_loglari yalnızca açık ve yeni iade edilmiş kayıtları tutar.
+ARSIV_KOLEKSIYONU = "transfer_arsivi"
+ARSIV_ALT_KOLEKSIYON = "arsiv_transferleri"
+ARSIV_BEKLEME_GUN = 7
+# Kayıt başına taşıma + silme, en kötü durumda bir de ay sayacı: 3 x 166 <= 500
+ARSIV_PARCA = 166
+
+def _iade_makinesi(tr):
+    # Dönüştürülen eski kayıtlarda Tablo / Makine_ID yoktur; makineye dokunulmaz
+    tablo, makine_id = tr.get('Tablo'), tr.get('Makine_ID')
+    if _bos_mu(tablo) or _bos_mu(makine_id): return None
+    return db.collection(str(tablo)).document(str(makine_id))
+
+def transfer_iade(transferler, ilerleme=None):
+    # transferler: Dokuman_ID, Makine_ID, Tablo ve Kaynak_Lokasyon içeren açık kayıtlar
+    makine_refs = {tr['Dokuman_ID']: _iade_makinesi(tr) for tr in transferler}
+    refs = [ref for ref in makine_refs.values() if ref is not None]
+    makineler = {doc.reference.path: doc.to_dict() or {} for doc in db.get_all(refs) if doc.exists} if refs else {}
+    simdi, gruplar, donenler = datetime.datetime.now(), [], defaultdict(dict)
+    for tr in transferler:
+        ref = makine_refs[tr['Dokuman_ID']]
+        makine, kaynak = makineler.get(ref.path) if ref else None, fs_deger(tr.get('Kaynak_Lokasyon'))
+        grup = [("update", db.collection('transfer_loglari').document(tr['Dokuman_ID']), {"Durum": TRANSFER_IADE, "Iade_Tarihi": simdi, "Iade_Alan": st.session_state["username"]})]
+        # Silinmiş makine, tablosu ya da kaynağı bilinmeyen kayıt yalnızca kapatılır
+        if makine is not None and kaynak and makine.get('Lokasyon') != kaynak:
+            grup.append(("update", ref, {"Lokasyon": kaynak}, ozet_farki(makine, {**makine, "Lokasyon": kaynak})))
+            donenler[tr['Tablo']][tr['Makine_ID']] = {"Lokasyon": kaynak}
+        gruplar.append(grup)
+    commit = gruplari_yaz(gruplar, ilerleme)
+    return {"transfer": len(gruplar), "donen": sum(len(m) for m in donenler.values()), "commit": commit, "tablolar": dict(donenler)}
+
+def arsiv_ayi(veri):
+    tarih = veri.get("Gonderim_Tarihi") if isinstance(veri.get("Gonderim_Tarihi"), datetime.datetime) else veri.get("Iade_Tarihi")
+    return tarih.strftime("%Y-%m") if isinstance(tarih, datetime.datetime) else "bilinmiyor"
+
+def transfer_arsivle(bekleme_gun=ARSIV_BEKLEME_GUN, parca=ARSIV_PARCA):
+    # Taşınan kayıtlar sorgudan düştüğü için imleç gerekmez; iş kesilirse
+    # kaldığı yerden devam eder. İlerleme system_jobs/arsiv_transfer altındadır.
+    durum_ref = db.collection('system_jobs').document('arsiv_transfer')
+    sinir = datetime.datetime.now() - datetime.timedelta(days=bekleme_gun)
+    q = (db.collection('transfer_loglari').where(filter=firestore.FieldFilter("Durum", "==", TRANSFER_IADE))
+         .where(filter=firestore.FieldFilter("Iade_Tarihi", "<", sinir)).order_by("Iade_Tarihi").limit(parca))
+    tasinan = 0
+    durum_ref.set({"tur": "arsiv", "durum": "calisiyor", "tasinan": 0, "guncelleme": datetime.datetime.now()})
+    try:
+        while True:
+            docs = yeniden_dene(lambda: list(q.stream()))
+            if not docs: break
+            islemler, aylar, simdi = [], defaultdict(int), datetime.datetime.now()
+            for doc in docs:
+                veri = doc.to_dict() or {}
+                ay = arsiv_ayi(veri)
+                aylar[ay] += 1
+                islemler.append(("set", db.collection(ARSIV_KOLEKSIYONU).document(ay).collection(ARSIV_ALT_KOLEKSIYON).document(doc.id), {**veri, "Durum": TRANSFER_ARSIV, "Arsiv_Tarihi": simdi}))
+                islemler.append(("delete", doc.reference, None))
+            # Ay dokümanları arşiv bölümlerini listelemek ve saymak için tutulur
+            for ay, n in aylar.items(): islemler.append(("merge", db.collection(ARSIV_KOLEKSIYONU).document(ay), {"ay": ay, "kayit": firestore.Increment(n)}))
+            yeniden_dene(lambda: _batch_commit(islemler))
+            tasinan += len(docs)
+            durum_ref.set({"durum": "calisiyor", "tasinan": tasinan, "guncelleme": datetime.datetime.now()}, merge=True)
+    except Exception as e:
+        durum_ref.set({"durum": "hata", "hata": str(e), "tasinan": tasinan, "guncelleme": datetime.datetime.now()}, merge=True)
+        raise
+    durum_ref.set({"durum": "tamamlandi", "tasinan": tasinan, "guncelleme": datetime.datetime.now()}, merge=True)
+    if tasinan: invalidate_table('transfer_loglari')
+    return tasinan
+
+@st.cache_resource
+def _arsiv_kilidi():
+    return threading.Lock()
+
+@st.cache_resource
+def _arsiv_havuzu():
+    # Sayfa okumalarının beklediği ortak havuzdan işçi almaması için ayrı tutulur
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="almaxtex_arsiv")
+
+def arsivlemeyi_baslat():
+    # Süreçte aynı anda tek arşivleme çalışır; çalışıyorsa yeni iş açılmaz
+    kilit = _arsiv_kilidi()
+    if not kilit.acquire(blocking=False): return None
+
+    def is_():
+        try: return transfer_arsivle()
+        finally: kilit.release()
+    return _arsiv_havuzu().submit(is_)
+
+def arsiv_aylari():
+    return sorted((doc.to_dict() or {"ay": doc.id} for doc in db.collection(ARSIV_KOLEKSIYONU).stream()), key=lambda a: a.get("ay", ""), reverse=True)
+
+def arsiv_kayitlari(ay, limit=ACIK_TRANSFER_MAX):
+    q = db.collection(ARSIV_KOLEKSIYONU).document(ay).collection(ARSIV_ALT_KOLEKSIYON).order_by("Gonderim_Tarihi").limit(limit)
+    return [doc_satiri(d) for d in q.stream()]
+
+# --- MAKİNE GEÇMİŞİ ---
+# "Makine X nerelerde bulundu?" sorusu Makine_ID eşitliği + Gonderim_Tarihi
+# sıralı sorguyla yanıtlanır: aktif kayıtlar transfer_loglari'ndan, eskiler arşiv
+# koleksiyon grubundan okunur (indeksler firestore.indexes.json'da). Sonuç makine
+# başına önbelleğe alınır; transfer / iade / arşivleme önbelleği geçersiz kılar.
+GECMIS_ALANLARI = ["Gonderim_Tarihi", "Geri_Alim_Tarihi", "Kaynak_Lokasyon", "Hedef_Lokasyon", "Durum", "Iade_Tarihi", "Transfer_Eden"]
+GECMIS_MAX = 500
+
+def _gecmis_sorgusu(q, makine_id, limit):
+    return (q.where(filter=firestore.FieldFilter("Makine_ID", "==", makine_id))
+            .order_by("Gonderim_Tarihi", direction=firestore.Query.DESCENDING).limit(limit))
+
+def makine_gecmisi_oku(tablo, makine_id, limit=GECMIS_MAX):
+    satirlar = []
+    for q in (db.collection('transfer_loglari'), db.collection_group(ARSIV_ALT_KOLEKSIYON)):
+        for doc in _gecmis_sorgusu(q, makine_id, limit).stream():
+            veri = doc.to_dict() or {}
+            # Doküman ID'leri tablolar arasında çakışabilir
+            if veri.get("Tablo", tablo) != tablo: continue
+            satirlar.append({"Transfer_ID": doc.id, **{k: veri.get(k) for k in GECMIS_ALANLARI}})
+    en_eski = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+    satirlar.sort(key=lambda r: r["Gonderim_Tarihi"] if isinstance(r["Gonderim_Tarihi"], datetime.datetime) and r["Gonderim_Tarihi"].tzinfo else en_eski, reverse=True)
+    return satirlar[:limit]
+
+def makine_gecmisi(tablo, makine_id):
+    anahtar = ("gecmis", tablo, makine_id, get_tablo_cache().versiyon('transfer_loglari'))
+    return get_sayfa_cache().get(anahtar, lambda: makine_gecmisi_oku(tablo, makine_id))
+
+def makine_bul(tablo, deger):
+    # Doküman ID'si ya da Seri No ile makine dokümanı
+    deger = deger.strip()
+    if not deger: return None
+    if "/" not in deger:
+        doc = db.collection(tablo).document(deger).get()
+        if doc.exists: return doc
+    return next(iter(db.collection(tablo).where(filter=firestore.FieldFilter("Seri No", "==", deger)).limit(1).stream()), None)
+
+# --- FİLTRELİ SEÇİM ---
+# Transfer ve silme editörleri tabloyu tarayıcıya göndermez: kullanıcı önce
+# Lokasyon / Departman / Seri No önekiyle daraltır, sorgu sunucuda çalışır ve
+# editör en fazla SECIM_MAX eşleşen satırı gösterir. "Eşleşen tümünü seç"
+# görüntülenen satırlara değil sorgunun kendisine uygulanır.
+SECIM_MAX = 500
+
+def filtreli_secim(tablo, anahtar):
+    # {"df": görüntülenecek satırlar, "sayi": eşleşen kayıt, "sunucu": filtreler}; indeks eksikse None
+    ozet = ozet_oku(tablo) or {}
+    if ozet.get("surum") != OZET_SURUMU: ozet = {}
+
+    def secenekler(sutun, varsayilan):
+        # Değerler özet dokümanından gelir; özet yoksa ya da kurulmamışsa
+        # (yalnızca farklar) varsayılan liste kullanılır
+        degerler = sorted(k for k, n in (ozet.get("sayimlar", {}).get(sutun) or {}).items() if n > 0 and k != "-")
+        return ["Tümü"] + (degerler or varsayilan)
+
+    f1, f2, f3 = st.columns(3)
+    with f1: lok = st.selectbox("Lokasyon:", secenekler("Lokasyon", get_locations()), key=f"fs_lok_{anahtar}_{tablo}")
+    with f2: dept = st.selectbox("Departman:", secenekler("Departman", []), key=f"fs_dept_{anahtar}_{tablo}")
+    with f3: onek = st.text_input("Seri No ile başlar:", key=f"fs_seri_{anahtar}_{tablo}").strip()
+    filtreler = []
+    if lok != "Tümü": filtreler.append(("Lokasyon", "==", lok))
+    if dept != "Tümü": filtreler.append(("Departman", "==", dept))
+    if onek: filtreler.append(("Seri No", "prefix", onek))
+    plan = sorgu_plani(tablo, filtreler)
+    try:
+        sayi = sorgu_sayisi(tablo, plan["sunucu"])
+        df = sorgu_ornegi(tablo, plan["sunucu"], SECIM_MAX)
+    except gcp_exceptions.FailedPrecondition:
+        st.error("Bu filtre birleşimi için bileşik indeks gerekiyor:")
+        st.code(json.dumps({"indexes": plan["indeksler"]}, indent=2, ensure_ascii=False), language="json")
+        return None
+    st.caption(f"Eşleşen: {sayi}" + (f" • ilk {SECIM_MAX} satır gösteriliyor, filtreyle daraltın ya da eşleşen tümünü seçin" if sayi > SECIM_MAX else ""))
+    return {"df": df, "sayi": sayi, "sunucu": plan["sunucu"]}
+
+@st.fragment
+@olculen("Makine Geçmişi")
+def makine_gecmisi_alani(tablo, anahtar):
+    with st.expander("🕘 Makine Geçmişi"):
+        aranan = st.text_input("Makine ID veya Seri No:", key=f"gecmis_{anahtar}_{tablo}")
+        if aranan:
+            doc = makine_bul(tablo, aranan)
+            if doc is None:
+                st.warning("Makine bulunamadı.")
+                return
+            t0 = time.perf_counter()
+            gecmis = makine_gecmisi(tablo, doc.id)
+            st.caption(f"ID: {doc.id} • Şu anki lokasyon: {(doc.to_dict() or {}).get('Lokasyon', '-')} • {len(gecmis)} transfer • {(time.perf_counter() - t0) * 1000:.0f} ms")
+            if gecmis: st.dataframe(pd.DataFrame(gecmis), hide_index=True, use_container_width=True)
+            else: st.info("Bu makinenin transfer kaydı yok.")
+
+# --- ŞEMA KAYDI ---
+# Tablo başına sütun tipleri (metin / sayi / tarih / bool). Yükleme, ekleme ve
+# güncelleme yolları değerleri bu tiplere çevirir; boş alanlar yazılmaz.
+# Kayıtlı tipler system_settings/semalar dokümanında tutulur; yüklemede tipi
+# bilinmeyen sütunlar ilk dolu değerden tahmin edilip kaydedilir.
+SEMA_TIPLERI = ["metin", "sayi", "tarih", "bool"]
+VARSAYILAN_SEMA = {"Seri No": "metin", "Versiyon": "metin", "Kullanıcı PC ID": "metin", "Kayit_Tarihi": "tarih"}
+TABLO_SEMALARI = {"transfer_loglari": {"Gonderim_Tarihi": "tarih", "Geri_Alim_Tarihi": "tarih"}}
+BOS_DEGERLER = {"", "None", "none", "nan", "NaN", "NaT"}
+TARIH_BICIMLERI = ["%d.%m.%Y", "%Y-%m-%d", "%d.%m.%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y"]
+DOGRU_DEGERLER = {"true", "evet", "1", "var", "yes"}
+YANLIS_DEGERLER = {"false", "hayır", "hayir", "0", "yok", "no"}
+
+class SemaDefteri:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.zaman = 0
+        self.semalar = {}
+
+    def get(self, tablo):
+        with self.lock:
+            if time.time() - self.zaman > self.ttl:
+                doc = db.collection('system_settings').document('semalar').get()
+                self.semalar = (doc.to_dict() or {}) if doc.exists else {}
+                self.zaman = time.time()
+            return {**VARSAYILAN_SEMA, **TABLO_SEMALARI.get(tablo, {}), **self.semalar.get(tablo, {})}
+
+    def sutunlar(self, tablo):
+        # Tabloya kaydedilmiş sütunlar; genel varsayılanlar tabloda olmayabilir
+        self.get(tablo)
+        with self.lock: return [*TABLO_SEMALARI.get(tablo, {}), *self.semalar.get(tablo, {})]
+
+    def kaydet(self, tablo, tipler):
+        db.collection('system_settings').document('semalar').set({tablo: tipler}, merge=True)
+        with self.lock: self.semalar.setdefault(tablo, {}).update(tipler)
+
+@st.cache_resource
+def get_sema_defteri():
+    return SemaDefteri(TABLO_CACHE_TTL)
+
+def get_sema(tablo):
+    return get_sema_defteri().get(tablo)
+
+def tip_tahmin(deger):
+    if isinstance(deger, bool): return "bool"
+    if isinstance(deger, (datetime.datetime, datetime.date)): return "tarih"
+    if isinstance(deger, (int, float)): return "sayi"
+    return "metin"
+
+def deger_donustur(deger, tip):
+    # Boş değerler None döner; çevrilemeyen değer olduğu gibi bırakılır
+    deger = fs_deger(deger)
+    if deger is None or (isinstance(deger, str) and deger.strip() in BOS_DEGERLER): return None
+    try:
+        if tip == "tarih":
+            if isinstance(deger, datetime.datetime): return deger
+            if isinstance(deger, datetime.date): return datetime.datetime.combine(deger, datetime.time())
+            for bicim in TARIH_BICIMLERI:
+                try: return datetime.datetime.strptime(str(deger).strip(), bicim)
+                except ValueError: pass
+            return deger
+        if tip == "sayi":
+            if isinstance(deger, (bool, int)): return int(deger)
+            if isinstance(deger, float): return int(deger) if deger.is_integer() else deger
+            metin = str(deger).strip().replace(",", ".")
+            return int(metin) if metin.lstrip("-").isdigit() else float(metin)
+        if tip == "bool":
+            if isinstance(deger, bool): return deger
+            metin = str(deger).strip().lower()
+            return True if metin in DOGRU_DEGERLER else False if metin in YANLIS_DEGERLER else deger
+        if tip == "metin":
+            if isinstance(deger, float) and deger.is_integer(): return str(int(deger))
+            return str(deger)
+    except (ValueError, TypeError): pass
+    return deger
+
+def semayi_uygula(sema, veri, bos_sil=False):
+    # bos_sil: güncellemede boşaltılan alanlar Firestore'dan silinir
+    sonuc = {}
+    for k, v in veri.items():
+        v = deger_donustur(v, sema.get(k))
+        if v is not None: sonuc[k] = v
+        elif bos_sil: sonuc[k] = firestore.DELETE_FIELD
+    return sonuc
+
+def indeks_degerleri(veri):
+    return {k: (None if v is firestore.DELETE_FIELD else v) for k, v in veri.items()}
+
+# --- EXCEL YÜKLEME ---
+# Sayfalar openpyxl read-only kipinde satır satır akıtılır; satırlar pandas
+# nesnesi üretilmeden doğrudan sözlüğe çevrilir ve 500'lük batch'ler ortak bir
+# havuzda (sayfalar arası) eşzamanlı yazılır. Bellekteki batch sayısı sınırlıdır.
+# Anahtar sütun seçilirse doküman ID'leri bu sütundan türetilir (upsert) ve
+# içerik özeti aynı kalan satırlar hiç yazılmaz. Uçuştaki bir parçayla ortak ID
+# taşıyan parça, o parça toplanana kadar gönderilmez; böylece dosyada tekrar
+# eden anahtarın son satırı, eski değeri görerek yazılır.
+YUKLEME_ESZAMANLI = 4
+
+def anahtar_doc_id(deger):
+    ham = str(deger).strip()
+    if ham and len(ham.encode()) <= 200 and "/" not in ham and ham not in (".", "..") and not (ham.startswith("__") and ham.endswith("__")):
+        return ham
+    # Firestore'un kabul etmediği değerler için özet kullanılır
+    return "k_" + hashlib.sha1(ham.encode()).hexdigest()
+
+def icerik_ozeti(veri):
+    return hashlib.sha1(json.dumps(veri, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+def _upsert_parca(koleksiyon, satirlar, kuru):
+    # satirlar: {doc_id: veri}; mevcut özetler yalnızca bu parçanın ID'leri için okunur
+    refs = [koleksiyon.document(d) for d in satirlar]
+    # Özet sütunlarının eski değerleri rapor sayımlarını düzeltmek için okunur
+    alanlar = ["_ozet"] + [FieldPath(s).to_api_repr() for s in OZET_SUTUNLARI]
+    mevcut = {doc.id: doc.to_dict() or {} for doc in db.get_all(refs, field_paths=alanlar) if doc.exists}
+    sonuc, islemler = {"eklenen": 0, "guncellenen": 0, "degismeyen": 0}, []
+    for ref in refs:
+        veri = satirlar[ref.id]
+        ozet = icerik_ozeti(veri)
+        eski = mevcut.get(ref.id)
+        if eski is None: sonuc["eklenen"] += 1
+        elif eski.get("_ozet") == ozet:
+            sonuc["degismeyen"] += 1
+            continue
+        else: sonuc["guncellenen"] += 1
+        islemler.append(("set", ref, {**veri, "_ozet": ozet}, ozet_farki(eski, veri)))
+    if not kuru: toplu_yaz(islemler)
+    return sonuc
+
+def satir_doc_id(kimlik, sayfa, satir):
+    # Ekleme kipinde iş + sayfa + satır sırasından türetilir; tekrar yazılan
+    # parça yeni doküman açmaz, aynı dokümanın üzerine yazar
+    return hashlib.sha1(f"{kimlik}/{sayfa}/{satir}".encode()).hexdigest()[:20]
+
+def _ekle_parca(islemler):
+    # Devam eden yüklemede kontrol noktasından sonraki parçalar önceki
+    # çalıştırmada yazılmış olabilir; özet farkı dokümanın mevcut haline göre
+    # yeniden hesaplanır, aynı satır iki kez sayılmaz
+    alanlar = [FieldPath(s).to_api_repr() for s in OZET_SUTUNLARI]
+    mevcut = {doc.id: doc.to_dict() or {} for doc in db.get_all([i[1] for i in islemler], field_paths=alanlar) if doc.exists}
+    return toplu_yaz([(tur, ref, veri, ozet_farki(mevcut.get(ref.id), veri)) for tur, ref, veri, _ in islemler])
+
+def excel_sayfalari(dosya):
+    # (sayfa_adı, başlıklar, satır üreteci)
+    if dosya.name.lower().endswith(".xls"):
+        # Eski .xls biçimini openpyxl okuyamaz
+        for ad, df in pd.read_excel(dosya, sheet_name=None).items():
+            yield ad, list(df.columns), (tuple(None if _bos_mu(v) else v for v in r) for r in df.itertuples(index=False, name=None))
+        return
+    import openpyxl
+    kitap = openpyxl.load_workbook(dosya, read_only=True, data_only=True)
+    try:
+        for sayfa in kitap.worksheets:
+            satirlar = sayfa.iter_rows(values_only=True)
+            basliklar = next(satirlar, None)
+            if basliklar: yield sayfa.title, basliklar, satirlar
+    finally: kitap.close()
+
+def excel_yukle(dosya, ozet, kuru=False, ilerleme=None, anahtar=None, istatistik=None, eszamanli=YUKLEME_ESZAMANLI, devam=None, kontrol_noktasi=None, kimlik=None):
+    # ozet (sayfa -> satır) ve istatistik (upsert sayaçları) yerinde doldurulur;
+    # hata olsa da yazılan sayfalar bilinir. Parçalar gönderildikleri sırayla
+    # toplanır; her parçadan sonra kontrol_noktasi {sayfa_sira, satir, ozet,
+    # istatistik} ile çağrılır. devam bu konumu alır: önceki sayfalar ve sayfanın
+    # yazılmış satırları atlanır. kimlik verilirse ekleme kipindeki doküman
+    # ID'leri belirlenimcidir (satir_doc_id); kontrol noktasından sonra yazılmış
+    # ama toplanmamış en çok eszamanli * 2 parça devamda mükerrer oluşturmaz.
+    from concurrent.futures import ThreadPoolExecutor
+    istatistik = istatistik if istatistik is not None else {}
+    for k in ("eklenen", "guncellenen", "degismeyen", "anahtarsiz"): istatistik.setdefault(k, 0)
+    devam = devam or {"sayfa_sira": 0, "satir": 0}
+    # Önceki çalıştırmada yazılmış olabilecek satırlar: toplanmamış parçaların üst sınırı
+    tekrar = eszamanli * 2 * OZETLI_BATCH if kimlik and (devam["sayfa_sira"] or devam["satir"]) else 0
+    bitenler = {}   # okunması biten sayfalar: ad -> (sıra, satır)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=eszamanli) as havuz:
+        bekleyen = deque()
+
+        def gonder(konum, is_, *args, anahtarlar=frozenset()):
+            # Aynı dokümanı eşzamanlı okuyan iki parça onu yok sayar; çakışan
+            # parça öncekiler sırayla toplanana kadar bekletilir
+            while anahtarlar and any(not anahtarlar.isdisjoint(a) for _, _, a in bekleyen): topla(*bekleyen.popleft())
+            bekleyen.append((havuz.submit(is_, *args), konum, anahtarlar))
+            while bekleyen and (len(bekleyen) >= eszamanli * 2 or bekleyen[0][0].done()): topla(*bekleyen.popleft())
+
+        def topla(fut, konum, anahtarlar=None):
+            sonuc = fut.result()
+            if isinstance(sonuc, dict):
+                for k, v in sonuc.items(): istatistik[k] += v
+            else: istatistik["eklenen"] += sonuc
+            if kontrol_noktasi:
+                sira, ad, n, anahtarsiz = konum
+                kontrol_noktasi({"sayfa_sira": sira, "satir": n, "ozet": {**{a: m for a, (i, m) in bitenler.items() if i < sira}, ad: n},
+                                 "istatistik": {**istatistik, "anahtarsiz": anahtarsiz}})
+
+        try:
+            for sira, (ad, basliklar, satirlar) in enumerate(excel_sayfalari(dosya)):
+                if sira < devam["sayfa_sira"]:
+                    bitenler[ad] = (sira, ozet.get(ad, 0))
+                    continue
+                atla = devam["satir"] if sira == devam["sayfa_sira"] else 0
+                # Başlıksız sütunlar atlanır
+                alanlar = [(i, str(b).strip()) for i, b in enumerate(basliklar) if b is not None and str(b).strip()]
+                anahtar_sira = next((i for i, k in alanlar if k == anahtar), None)
+                koleksiyon = db.collection(ad)
+                sema, yeni_tipler = get_sema(ad), {}
+                ozet[ad], parca = 0, {} if anahtar else []
+                for satir in satirlar:
+                    if all(v is None for v in satir): continue
+                    ham = {k: satir[i] for i, k in alanlar if i < len(satir) and satir[i] is not None}
+                    for k, v in ham.items():
+                        if k not in sema and deger_donustur(v, None) is not None: sema[k] = yeni_tipler[k] = tip_tahmin(v)
+                    ozet[ad] += 1
+                    # Önceki çalıştırmada yazılmış satır; tipler yine de tahmin edilir
+                    if ozet[ad] <= atla: continue
+                    veri = semayi_uygula(sema, ham)
+                    if anahtar:
+                        if anahtar_sira is None or anahtar_sira >= len(satir) or satir[anahtar_sira] is None:
+                            istatistik["anahtarsiz"] += 1
+                            continue
+                        # Aynı anahtar dosyada tekrar ederse son satır geçerlidir
+                        parca[anahtar_doc_id(satir[anahtar_sira])] = veri
+                    elif kuru: continue
+                    else: parca.append(("set", koleksiyon.document(satir_doc_id(kimlik, ad, ozet[ad]) if kimlik else None), veri, ozet_farki(None, veri)))
+                    if len(parca) == OZETLI_BATCH:
+                        konum = (sira, ad, ozet[ad], istatistik["anahtarsiz"])
+                        if anahtar: gonder(konum, _upsert_parca, koleksiyon, parca, kuru, anahtarlar={(ad, d) for d in parca})
+                        elif tekrar > 0:
+                            gonder(konum, _ekle_parca, parca)
+                            tekrar -= len(parca)
+                        else: gonder(konum, toplu_yaz, parca)
+                        parca = {} if anahtar else []
+                    if ilerleme and ozet[ad] % OZETLI_BATCH == 0: ilerleme(ad, ozet[ad])
+                if parca:
+                    konum = (sira, ad, ozet[ad], istatistik["anahtarsiz"])
+                    if anahtar: gonder(konum, _upsert_parca, koleksiyon, parca, kuru, anahtarlar={(ad, d) for d in parca})
+                    elif tekrar > 0:
+                        gonder(konum, _ekle_parca, parca)
+                        tekrar -= len(parca)
+                    else: gonder(konum, toplu_yaz, parca)
+                bitenler[ad] = (sira, ozet[ad])
+                if yeni_tipler and not kuru: get_sema_defteri().kaydet(ad, yeni_tipler)
+                if ilerleme: ilerleme(ad, ozet[ad])
+        except BaseException:
+            # İptal ya da hata: gönderilmiş parçalar sırayla toplanır, kontrol
+            # noktası yazılmış her parçayı kapsar
+            while bekleyen:
+                try: topla(*bekleyen.popleft())
+                except Exception: break
+            raise
+        while bekleyen: topla(*bekleyen.popleft())
+    return time.perf_counter() - t0
+
+# --- SAYFALI OKUMA ---
+# Tablo Görüntüleme için imleç (start_after) tabanlı sayfalama. Sayfalar ve
+# count() sonuçları tablo versiyonuyla anahtarlanır; sonraki sayfa arka planda
+# önceden okunur.
+SAYFA_BOYUTLARI = [25, 50, 100, 250]
+SAYFA_CACHE_MAX = 64
+
+@st.cache_resource
+def get_arka_plan_havuzu():
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="almaxtex")
+
+class SayfaCache:
+    def __init__(self, ttl, max_sayfa):
+        self.ttl = ttl
+        self.max_sayfa = max_sayfa
+        self.lock = threading.Lock()
+        self.sayfalar = OrderedDict()   # anahtar -> (zaman, future)
+
+    def get(self, anahtar, yukle, bekle=True):
+        with self.lock:
+            kayit = self.sayfalar.get(anahtar)
+            if kayit is None or time.time() - kayit[0] > self.ttl or (kayit[1].done() and kayit[1].exception()):
+                kayit = (time.time(), get_arka_plan_havuzu().submit(yukle))
+                self.sayfalar[anahtar] = kayit
+                while len(self.sayfalar) > self.max_sayfa:
+                    self.sayfalar.popitem(last=False)
+            self.sayfalar.move_to_end(anahtar)
+        return kayit[1].result() if bekle else None
+
+@st.cache_resource
+def get_sayfa_cache():
+    return SayfaCache(TABLO_CACHE_TTL, SAYFA_CACHE_MAX)
+
+def _sayfa_oku(tablo, boyut, son_id):
+    q = db.collection(tablo).order_by(FieldPath.document_id()).limit(boyut + 1)
+    if son_id: q = q.start_after({FieldPath.document_id(): son_id})
+    docs = list(q.stream())
+    satirlar = [doc_satiri(doc) for doc in docs[:boyut]]
+    sonraki = docs[boyut - 1].id if len(docs) > boyut else None
+    return satirlar, sonraki
+
+def get_table_page(tablo, boyut, son_id=None, bekle=True):
+    anahtar = (tablo, get_tablo_cache().versiyon(tablo), boyut, son_id)
+    return get_sayfa_cache().get(anahtar, lambda: _sayfa_oku(tablo, boyut, son_id), bekle)
+
+def get_table_count(tablo):
+    return get_katalog().sayi(tablo)
+
+# --- DIŞA AKTARMA ---
+# Tablolar Firestore'dan parça parça okunup doğrudan dosyaya yazılır (xlsx /
+# csv / parquet); tablo bellekte DataFrame olarak kurulmaz. Üretilen dosyalar
+# tablo versiyonuna göre diskte tutulur, değişmeyen tablo yeniden üretilmez.
+# Uygulama dışı yazmalar için dosyalar en fazla DISA_AKTARMA_TTL saniye geçerlidir.
+DISA_AKTARMA_KLASORU = os.path.join(tempfile.gettempdir(), "almaxtex_disa_aktarma")
+DISA_AKTARMA_TTL = 600  # saniye
+DISA_AKTARMA_PARCA = 1000
+DISA_AKTARMA_MIME = {"xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+def disa_aktarma_bicimleri():
+    return [b for b in DISA_AKTARMA_MIME if b != "parquet" or parquet_destekli()]
+
+def dokumanlari_akit(tablo, parca=DISA_AKTARMA_PARCA):
+    son_id = None
+    while True:
+        q = db.collection(tablo).order_by(FieldPath.document_id()).limit(parca)
+        if son_id: q = q.start_after({FieldPath.document_id(): son_id})
+        docs = yeniden_dene(lambda: list(q.stream()))
+        yield from docs
+        if len(docs) < parca: return
+        son_id = docs[-1].id
+
+def tablo_disa_aktar(tablo, bicim, yol):
+    # Sütunların tamamı akış bitince belli olur: satırlar önce diskteki ara
+    # dosyaya yazılır, başlıklar toplandıktan sonra hedef dosyaya aktarılır
+    basliklar, n = {"Dokuman_ID": None}, 0
+    with tempfile.TemporaryFile() as ara:
+        for doc in dokumanlari_akit(tablo):
+            satir = doc_satiri(doc)
+            for k in satir: basliklar.setdefault(k, None)
+            pickle.dump(satir, ara)
+            n += 1
+        ara.seek(0)
+        satirlar = ([satir.get(b) for b in basliklar] for satir in (pickle.load(ara) for _ in range(n)))
+        satirlari_disa_aktar(yol, bicim, list(basliklar), satirlar, get_sema(tablo))
+    return n
+
+class DisaAktarmaCache:
+    def __init__(self, klasor, ttl):
+        self.klasor = klasor
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.uretim_kilitleri = defaultdict(threading.Lock)
+        self.dosyalar = {}  # (tablo, biçim) -> (versiyon, zaman, yol, satır)
+        os.makedirs(klasor, exist_ok=True)
+        # Önceki süreçlerden kalan eski dosyalar temizlenir
+        for ad in os.listdir(klasor):
+            yol = os.path.join(klasor, ad)
+            try:
+                if time.time() - os.path.getmtime(yol) > ttl: os.remove(yol)
+            except OSError: pass
+
+    def _taze(self, anahtar, versiyon):
+        kayit = self.dosyalar.get(anahtar)
+        if kayit and kayit[0] == versiyon and time.time() - kayit[1] < self.ttl and os.path.exists(kayit[2]): return kayit
+        return None
+
+    def get(self, tablo, bicim):
+        # (yol, satır sayısı, önbellekten mi)
+        anahtar = (tablo, bicim)
+        with self.lock: kilit = self.uretim_kilitleri[anahtar]
+        # Aynı dosyayı aynı anda isteyen oturumlar tek bir üretimi paylaşır
+        with kilit:
+            versiyon = get_tablo_cache().versiyon(tablo)
+            with self.lock: kayit = self._taze(anahtar, versiyon)
+            if kayit: return kayit[2], kayit[3], True
+            yol = os.path.join(self.klasor, f"{hashlib.md5(tablo.encode()).hexdigest()[:12]}_{versiyon}_{int(time.time())}.{bicim}")
+            n = tablo_disa_aktar(tablo, bicim, yol + ".tmp")
+            os.replace(yol + ".tmp", yol)
+            with self.lock:
+                eski = self.dosyalar.get(anahtar)
+                self.dosyalar[anahtar] = (versiyon, time.time(), yol, n)
+            if eski and eski[2] != yol:
+                try: os.remove(eski[2])
+                except OSError: pass
+            return yol, n, False
+
+@st.cache_resource
+def get_disa_aktarma_cache():
+    return DisaAktarmaCache(DISA_AKTARMA_KLASORU, DISA_AKTARMA_TTL)
+
+@st.fragment
+@olculen("Dışa Aktarma")
+def disa_aktarma_alani(tablo, dosya_adi):
+    # Sayfalardaki ortak indirme alanı: biçim seçimi, hazırlama ve indirme
+    e1, e2 = st.columns([1, 3])
+    with e1: bicim = st.radio("Biçim:", disa_aktarma_bicimleri(), horizontal=True, key=f"disa_bicim_{tablo}")
+    with e2:
+        if st.button("Dışa Aktarımı Hazırla", key=f"disa_hazirla_{tablo}"):
+            t0 = time.perf_counter()
+            yol, n, onbellek = get_disa_aktarma_cache().get(tablo, bicim)
+            st.caption(f"{n} satır, " + ("önbellekten" if onbellek else f"{time.perf_counter() - t0:.1f} sn"))
+            with open(yol, "rb") as f:
+                st.download_button(t("download_excel") if bicim == "xlsx" else f"{bicim.upper()} İndir", data=f, file_name=f"{dosya_adi}.{bicim}", mime=DISA_AKTARMA_MIME[bicim], key=f"disa_indir_{tablo}", on_click="ignore")
+
+# --- ARKA PLAN İŞLERİ ---
+# Uzun süren toplu işlemler (Excel yükleme, tablo silme, toplu güncelleme,
+# transfer) script thread'inde değil, süreç genelindeki iş havuzunda çalışır;
+# sayfadan ayrılmak ya da bağlantının kopması işi yarıda bırakmaz. Durum,
+# ilerleme, hız, hata ve kontrol noktası system_jobs altında tutulur, iş verisi
+# (dosya, satırlar) uygulama klasöründe yalnızca sahibine açık IS_KLASORU'nde
+# JSON olarak (yüklenen dosya ham bayt olarak) saklanır. İptal edilen, hata alan ya da süreç
+# yeniden başladığı için yarım kalan iş son kontrol noktasından sürdürülebilir.
+IS_KOLEKSIYONU = "system_jobs"
+IS_ESZAMANLI = 4
+IS_YOKLAMA = 2          # saniye; iş listesinin yenilenme aralığı
+IS_LISTE_MAX = 10
+IS_VERI_SAKLAMA_GUN = 7
+IS_KLASORU = "isler"
+IS_BEKLIYOR, IS_CALISIYOR, IS_TAMAM, IS_HATA, IS_IPTAL = "bekliyor", "calisiyor", "tamamlandi", "hata", "iptal"
+IS_AKTIF = (IS_BEKLIYOR, IS_CALISIYOR)
+
+class IsIptal(Exception):
+    pass
+
+def _is_json_kodla(deger):
+    # İş verisindeki tarihler etiketlenerek yazılır; diğer tipler JSON'un kendisidir
+    if isinstance(deger, datetime.datetime): return {"__datetime__": deger.isoformat()}
+    if isinstance(deger, datetime.date): return {"__date__": deger.isoformat()}
+    raise TypeError(f"İş verisinde desteklenmeyen tip: {type(deger).__name__}")
+
+def _is_json_coz(d):
+    if "__datetime__" in d: return datetime.datetime.fromisoformat(d["__datetime__"])
+    if "__date__" in d: return datetime.date.fromisoformat(d["__date__"])
+    return d
+
+def _ozel_klasor(klasor):
+    # İş verisi yalnızca bu sürecin kullanıcısına açık klasörde tutulur; başkasının
+    # önceden oluşturduğu ya da bağladığı klasör kullanılmaz
+    os.makedirs(klasor, mode=0o700, exist_ok=True)
+    if os.path.islink(klasor): raise PermissionError(f"{klasor} bir sembolik bağlantı; iş verisi saklanmaz")
+    if hasattr(os, "getuid"):
+        bilgi = os.stat(klasor)
+        if bilgi.st_uid != os.getuid(): raise PermissionError(f"{klasor} başka bir kullanıcıya ait; iş verisi saklanmaz")
+        if bilgi.st_mode & 0o077: os.chmod(klasor, 0o700)
+
+class IsBaglami:
+    # Çalışan işin tek bağlantı noktası: kontrol noktası yazımı ve iptal isteği
+    def __init__(self, is_id, kayit):
+        self.is_id = is_id
+        self.ref = db.collection(IS_KOLEKSIYONU).document(is_id)
+        self.tur, self.kullanici, self.anahtar = kayit["tur"], kayit.get("kullanici"), kayit.get("anahtar")
+        self.kontrol = dict(kayit.get("kontrol") or {})
+        self.islenen = self.baslangic = kayit.get("islenen", 0)
+        self.toplam = kayit.get("toplam")
+        self.hiz = 0.0
+        self.basladi = False
+        self.iptal = threading.Event()
+        self.t0 = time.perf_counter()
+
+    def kontrol_noktasi(self, islenen, toplam=None, **kontrol):
+        # Her tamamlanan parçadan sonra yazılır; devam eden iş yazılmış parçayı tekrarlamaz
+        self.islenen = islenen
+        if toplam is not None: self.toplam = toplam
+        self.kontrol.update(kontrol)
+        self.hiz = (islenen - self.baslangic) / max(time.perf_counter() - self.t0, 1e-6)
+        self.ref.set({"durum": IS_CALISIYOR, "islenen": islenen, "toplam": self.toplam, "hiz": round(self.hiz, 1), "kontrol": self.kontrol, "guncelleme": datetime.datetime.now()}, merge=True)
+
+    def iptal_kontrol(self):
+        if self.iptal.is_set(): raise IsIptal()
+
+    def ilerleme(self, islenen, toplam=None, **kontrol):
+        self.kontrol_noktasi(islenen, toplam, **kontrol)
+        self.iptal_kontrol()
+
+def _is_tablo_sil(baglam, veri):
+    tablo = veri["tablo"]
+    # Silme yarıda kalırsa özet geçersizdir; rapor yeniden kurmayı önerir
+    ozet_sil(tablo)
+    try:
+        silinen, hiz = toplu_sil(referanslari_akit(tablo, baglam.kontrol.get("son_id")), baslangic=baglam.islenen,
+                                 kontrol_noktasi=lambda n, son_id: baglam.kontrol_noktasi(n, veri["toplam"], son_id=son_id),
+                                 ilerleme=lambda n, h: baglam.iptal_kontrol())
+    finally:
+        invalidate_table(tablo)
+        # Tamamen boşalan koleksiyon Firestore'dan da kalkar
+        if get_table_count(tablo) == 0: get_katalog().tablo_silindi(tablo)
+    log_kayit_ekle("KRITIK_SILME", "delete_table", f"Tablo Silindi: {tablo}", f"{silinen} doküman, {hiz:.0f} doküman/sn", tablo=tablo, kullanici=baglam.kullanici)
+    return {"silinen": silinen}
+
+def _is_kayit_sil(baglam, veri):
+    # veri["kayitlar"]: Dokuman_ID ve özet sütunlarını içeren satırlar; kontrol noktası son silinen parçanın son ID'sidir
+    tablo, kayitlar = veri["tablo"], {r["Dokuman_ID"]: r for r in veri["kayitlar"]}
+    ids, son_id = list(kayitlar), baglam.kontrol.get("son_id")
+    if son_id:
+        ids = ids[ids.index(son_id) + 1:]
+        # Kontrol noktasından sonra silinmiş ama toplanmamış parçalar atlanır; özetten iki kez düşülmez
+        pencere = ids[:SILME_ESZAMANLI * OZETLI_BATCH]
+        alanlar = [FieldPath(s).to_api_repr() for s in OZET_SUTUNLARI]
+        mevcut = {doc.id for doc in db.get_all([db.collection(tablo).document(i) for i in pencere], field_paths=alanlar) if doc.exists} if pencere else set()
+        ids = [i for i in pencere if i in mevcut] + ids[len(pencere):]
+    parcalar = ([db.collection(tablo).document(i) for i in ids[k:k + OZETLI_BATCH]] for k in range(0, len(ids), OZETLI_BATCH))
+    try:
+        silinen, hiz = toplu_sil(parcalar, baslangic=baglam.islenen, ozet_farklari={i: ozet_farki(r, None) for i, r in kayitlar.items()},
+                                 kontrol_noktasi=lambda n, son: baglam.kontrol_noktasi(n, len(kayitlar), son_id=son),
+                                 ilerleme=lambda n, h: baglam.iptal_kontrol())
+    finally: invalidate_table(tablo, silinenler=list(kayitlar))
+    log_kayit_ekle("SİLME", "delete", f"{silinen} Kayıt Silindi", f"Tablo: {tablo}, {hiz:.0f} doküman/sn", tablo=tablo, kullanici=baglam.kullanici)
+    return {"silinen": silinen}
+
+def _is_yukleme(baglam, veri):
+    dosya = io.BytesIO(veri["icerik"])
+    dosya.name = veri["ad"]
+    konum, baslangic = baglam.kontrol.get("konum"), baglam.islenen
+    ozet, istatistik = dict((konum or {}).get("ozet", {})), dict((konum or {}).get("istatistik", {}))
+    try:
+        sure = excel_yukle(dosya, ozet, veri["kuru"], lambda ad, n: baglam.iptal_kontrol(), veri["anahtar"], istatistik, devam=konum,
+                           kontrol_noktasi=lambda k: baglam.kontrol_noktasi(sum(k["ozet"].values()), konum=k), kimlik=baglam.is_id)
+    finally:
+        # Yarıda kesilen yüklemelerde de yazılan sayfalar yenilenmeli
+        if not veri["kuru"]:
+            for ad in ozet: invalidate_table(ad)
+    toplam = sum(ozet.values())
+    baglam.islenen = toplam
+    if not veri["kuru"]: log_kayit_ekle("YUKLEME", "upload", "Excel Yüklendi", f"Dosya: {veri['ad']}, {toplam} satır, {sure:.1f} sn" + (f", anahtar: {veri['anahtar']}, {istatistik}" if veri["anahtar"] else ""), kullanici=baglam.kullanici)
+    sonuc = {"sayfalar": ozet, "satir": toplam, "sure": round(sure, 1), "satir_sn": round((toplam - baslangic) / max(sure, 1e-6))}
+    # Anahtarlı yüklemede içeriği değişmeyen satırlar yazılmaz
+    if veri["anahtar"]: sonuc.update(istatistik, tasarruf_edilen_yazma=istatistik["degismeyen"])
+    return sonuc
+
+def _is_guncelleme(baglam, veri):
+    tablo, baslangic = veri["tablo"], baglam.islenen
+    # DELETE_FIELD JSON'dan geçmez; boşaltılan alanlar veride None olarak saklanır.
+    # Özet farkları [(sütun, değer) ya da None, fark] çiftleri olarak gelir
+    islemler = [("merge", db.collection(tablo).document(doc_id), {k: firestore.DELETE_FIELD if v is None else v for k, v in alanlar.items()}, {tuple(k) if k else None: n for k, n in fark})
+                for doc_id, alanlar, fark in veri["islemler"]]
+    try: toplu_yaz(islemler[baslangic:], lambda n, toplam: baglam.ilerleme(baslangic + n, len(islemler)))
+    finally: invalidate_table(tablo, degisenler={doc_id: alanlar for doc_id, alanlar, _ in veri["islemler"]})
+    alan_sayisi = sum(len(alanlar) for _, alanlar, _ in veri["islemler"])
+    log_kayit_ekle("GÜNCELLEME", "update", f"Tablo Güncellendi: {tablo}", f"{len(islemler)} doküman, {alan_sayisi} alan", tablo=tablo, kullanici=baglam.kullanici)
+    return {"dokuman": len(islemler), "alan": alan_sayisi}
+
+def _is_transfer(baglam, veri):
+    tablo, hedef = veri["tablo"], veri["hedef"]
+    try:
+        olcum = makine_transfer(tablo, veri["makineler"], hedef, veri["gonderim"], veri["geri_alim"], baglam.ilerleme, kullanici=baglam.kullanici, baslangic=baglam.islenen, kimlik=baglam.is_id)
+    finally:
+        invalidate_table(tablo, degisenler={m['Dokuman_ID']: {'Lokasyon': hedef} for m in veri["makineler"]})
+        invalidate_table('transfer_loglari')
+    log_kayit_ekle("TRANSFER", "transfer", f"{olcum['makine']} Makine Transfer Edildi: {hedef}", f"Tablo: {tablo}, {olcum['commit']} commit, {olcum['sure']:.2f} sn" + (", seri no listesiyle" if veri.get("seri_listesi") else ""), tablo=tablo, kullanici=baglam.kullanici)
+    # Yeni iade tarihleri bugünkü uyarıları değiştirebilir
+    try: uyari_ozeti_olustur()
+    except gcp_exceptions.FailedPrecondition: pass
+    return {"makine": olcum["makine"], "commit": olcum["commit"], "eski_rpc": olcum["eski_rpc"], "sure": round(olcum["sure"], 2)}
+
+IS_TURLERI = {"tablo_sil": _is_tablo_sil, "kayit_sil": _is_kayit_sil, "yukleme": _is_yukleme, "guncelleme": _is_guncelleme, "transfer": _is_transfer}
+
+class IsYurutucu:
+    def __init__(self, eszamanli, klasor):
+        from concurrent.futures import ThreadPoolExecutor
+        self.havuz = ThreadPoolExecutor(max_workers=eszamanli, thread_name_prefix="almaxtex_is")
+        self.klasor = klasor
+        self.lock = threading.Lock()
+        self.calisanlar = {}    # is_id -> IsBaglami; kuyrukta bekleyenler dahil
+        _ozel_klasor(klasor)
+        # Devam ettirilmeyen eski işlerin verisi tutulmaz
+        sinir = time.time() - IS_VERI_SAKLAMA_GUN * 86400
+        for ad in os.listdir(klasor):
+            with contextlib.suppress(OSError):
+                if os.path.getmtime(os.path.join(klasor, ad)) < sinir: os.remove(os.path.join(klasor, ad))
+
+    def _veri_yolu(self, is_id, uzanti="json"):
+        return os.path.join(self.klasor, f"{is_id}.{uzanti}")
+
+    def _veri_yaz(self, is_id, veri):
+        # Çalıştırılabilir biçim (pickle) kullanılmaz: yüklenen dosya ham bayt,
+        # geri kalan her şey JSON olarak yazılır
+        veri = dict(veri)
+        icerik = veri.pop("icerik", None)
+        if icerik is not None:
+            with open(self._veri_yolu(is_id, "bin"), "wb") as f: f.write(icerik)
+        with open(self._veri_yolu(is_id), "w", encoding="utf-8") as f: json.dump(veri, f, ensure_ascii=False, default=_is_json_kodla)
+
+    def _veri_oku(self, is_id):
+        with open(self._veri_yolu(is_id), encoding="utf-8") as f: veri = json.load(f, object_hook=_is_json_coz)
+        if os.path.exists(self._veri_yolu(is_id, "bin")):
+            with open(self._veri_yolu(is_id, "bin"), "rb") as f: veri["icerik"] = f.read()
+        return veri
+
+    def _veri_sil(self, is_id):
+        for uzanti in ("json", "bin"):
+            with contextlib.suppress(OSError): os.remove(self._veri_yolu(is_id, uzanti))
+
+    def gonder(self, tur, baslik, kullanici, veri, anahtar=None):
+        # anahtar: aynı hedefte ikinci bir işin başlamasını önler (ör. aynı tablonun silinmesi)
+        simdi = datetime.datetime.now()
+        is_id = f"{tur}_{simdi:%Y%m%d_%H%M%S}_{os.urandom(3).hex()}"
+        kayit = {"tur": tur, "baslik": baslik, "kullanici": kullanici, "anahtar": anahtar, "durum": IS_BEKLIYOR, "islenen": 0, "toplam": None,
+                 "hiz": 0, "hata": None, "kontrol": {}, "olusturma": simdi, "guncelleme": simdi}
+        with self.lock:
+            if anahtar and any(b.anahtar == anahtar for b in self.calisanlar.values()): return None
+            baglam = self.calisanlar[is_id] = IsBaglami(is_id, kayit)
+        try:
+            self._veri_yaz(is_id, veri)
+            baglam.ref.set(kayit)
+        except Exception:
+            with self.lock: self.calisanlar.pop(is_id, None)
+            self._veri_sil(is_id)
+            raise
+        self.havuz.submit(self._calistir, baglam)
+        return is_id
+
+    def devam_edebilir(self, is_id):
+        with self.lock: calisiyor = is_id in self.calisanlar
+        return not calisiyor and os.path.exists(self._veri_yolu(is_id))
+
+    def devam_et(self, is_id):
+        doc = db.collection(IS_KOLEKSIYONU).document(is_id).get()
+        if not doc.exists or not os.path.exists(self._veri_yolu(is_id)): return False
+        kayit = doc.to_dict()
+        with self.lock:
+            if is_id in self.calisanlar or (kayit.get("anahtar") and any(b.anahtar == kayit["anahtar"] for b in self.calisanlar.values())): return False
+            baglam = self.calisanlar[is_id] = IsBaglami(is_id, kayit)
+        baglam.ref.set({"durum": IS_BEKLIYOR, "hata": None, "guncelleme": datetime.datetime.now()}, merge=True)
+        self.havuz.submit(self._calistir, baglam)
+        return True
+
+    def iptal_et(self, is_id):
+        with self.lock: baglam = self.calisanlar.get(is_id)
+        if baglam: baglam.iptal.set()
+        return baglam is not None
+
+    def canli(self, is_id):
+        # Bu süreçte çalışan ya da kuyrukta bekleyen işin güncel durumu (okuma gerektirmez)
+        with self.lock: b = self.calisanlar.get(is_id)
+        if b is None: return None
+        return {"durum": IS_CALISIYOR if b.basladi else IS_BEKLIYOR, "islenen": b.islenen, "toplam": b.toplam, "hiz": round(b.hiz, 1), "iptal": b.iptal.is_set()}
+
+    def canli_isler(self, tur, kullanici=None):
+        with self.lock: return frozenset(i for i, b in self.calisanlar.items() if b.tur == tur and kullanici in (None, b.kullanici))
+
+    def canli_var(self, tur, kullanici=None):
+        return bool(self.canli_isler(tur, kullanici))
+
+    def _calistir(self, baglam):
+        try:
+            baglam.iptal_kontrol()
+            veri = self._veri_oku(baglam.is_id)
+            baglam.basladi = True
+            baglam.t0 = time.perf_counter()
+            baglam.ref.set({"durum": IS_CALISIYOR, "guncelleme": datetime.datetime.now()}, merge=True)
+            sonuc = IS_TURLERI[baglam.tur](baglam, veri)
+            baglam.ref.set({"durum": IS_TAMAM, "sonuc": sonuc, "islenen": baglam.islenen, "hiz": round(baglam.hiz, 1), "bitis": datetime.datetime.now(), "guncelleme": datetime.datetime.now()}, merge=True)
+            self._veri_sil(baglam.is_id)
+        except IsIptal:
+            with contextlib.suppress(Exception): baglam.ref.set({"durum": IS_IPTAL, "guncelleme": datetime.datetime.now()}, merge=True)
+        except Exception as e:
+            with contextlib.suppress(Exception): baglam.ref.set({"durum": IS_HATA, "hata": f"{type(e).__name__}: {e}"[:1000], "guncelleme": datetime.datetime.now()}, merge=True)
+        finally:
+            with self.lock: self.calisanlar.pop(baglam.is_id, None)
+
+@st.cache_resource
+def get_is_yurutucu():
+    return IsYurutucu(IS_ESZAMANLI, IS_KLASORU)
+
+def is_kayitlari(tur, kullanici=None):
+    # tur (+ kullanici) eşitliği ve olusturma sıralaması bileşik indeks ister, bkz. firestore.indexes.json
+    q = db.collection(IS_KOLEKSIYONU).where(filter=firestore.FieldFilter("tur", "==", tur))
+    if kullanici: q = q.where(filter=firestore.FieldFilter("kullanici", "==", kullanici))
+    return [{"id": d.id, **(d.to_dict() or {})} for d in q.order_by("olusturma", direction=firestore.Query.DESCENDING).limit(IS_LISTE_MAX).stream()]
+
+# --- AYARLAR ---
+# system_settings dokümanları süreç içinde önbellekte tutulur; lokasyon listesi
+# gibi her sayfada birkaç kez okunan ayarlar kararlı durumda Firestore okuması
+# gerektirmez. Uygulamanın yazmaları önbelleği yerinde günceller. Liste
+# değişiklikleri ArrayUnion / ArrayRemove ile yazılır, aynı anda çalışan
+# yöneticiler birbirinin değişikliğini ezmez. Başka süreçlerin yazmaları
+# yenileme süresi dolunca görünür.
+AYAR_TTL = 60  # saniye
+VARSAYILAN_LOKASYONLAR = ["Bursa", "Mısır", "Mardin", "İstanbul", "Depo"]
+
+class AyarDefteri:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.belgeler = {}      # doküman -> (okuma zamanı, veri; doküman yoksa None)
+
+    def _ref(self, dokuman):
+        return db.collection('system_settings').document(dokuman)
+
+    def get(self, dokuman, taze=False):
+        with self.lock:
+            kayit = self.belgeler.get(dokuman)
+            if kayit and not taze and time.time() - kayit[0] < self.ttl: return copy.deepcopy(kayit[1])
+        doc = self._ref(dokuman).get()
+        veri = doc.to_dict() if doc.exists else None
+        with self.lock: self.belgeler[dokuman] = (time.time(), veri)
+        return copy.deepcopy(veri)
+
+    def yaz(self, dokuman, veri):
+        self._ref(dokuman).set(veri)
+        with self.lock: self.belgeler[dokuman] = (time.time(), copy.deepcopy(veri))
+
+    def diziye_ekle(self, dokuman, alan, degerler):
+        self._ref(dokuman).set({alan: firestore.ArrayUnion(degerler)}, merge=True)
+        self._dizi_guncelle(dokuman, alan, lambda dizi: dizi + [d for d in degerler if d not in dizi])
+
+    def diziden_cikar(self, dokuman, alan, degerler):
+        self._ref(dokuman).set({alan: firestore.ArrayRemove(degerler)}, merge=True)
+        self._dizi_guncelle(dokuman, alan, lambda dizi: [d for d in dizi if d not in degerler])
+
+    def _dizi_guncelle(self, dokuman, alan, fonk):
+        # Okuma zamanı korunur: diğer alanlardaki dış değişiklikler yine TTL ile gelir
+        with self.lock:
+            kayit = self.belgeler.get(dokuman)
+            if kayit is None: return
+            veri = dict(kayit[1] or {})
+            veri[alan] = fonk(list(veri.get(alan, [])))
+            self.belgeler[dokuman] = (kayit[0], veri)
+
+@st.cache_resource
+def get_ayar_defteri():
+    return AyarDefteri(AYAR_TTL)
+
+def get_locations():
+    ayarlar = get_ayar_defteri().get('locations')
+    if ayarlar is None:
+        get_ayar_defteri().diziye_ekle('locations', 'list', VARSAYILAN_LOKASYONLAR)
+        return sorted(VARSAYILAN_LOKASYONLAR)
+    return sorted(ayarlar.get('list', []))
 
 def add_location(new_loc):
-    current_locs = get_locations()
-    if new_loc and new_loc not in current_locs:
-        current_locs.append(new_loc)
-        db.collection('system_settings').document('locations').set({'list': current_locs})
+    if new_loc and new_loc not in get_locations():
+        get_ayar_defteri().diziye_ekle('locations', 'list', [new_loc])
         return True
     return False
 
 def remove_location(loc_to_remove):
-    current_locs = get_locations()
-    if loc_to_remove in current_locs:
-        current_locs.remove(loc_to_remove)
-        db.collection('system_settings').document('locations').set({'list': current_locs})
+    if loc_to_remove in get_locations():
+        get_ayar_defteri().diziden_cikar('locations', 'list', [loc_to_remove])
         return True
     return False
 
@@ -359,6 +2439,353 @@ def generate_temp_password(length=8):
     chars = string.ascii_letters + string.digits
     return ''.join(random.choice(chars) for i in range(length))
 
+# --- SAYFA BÖLÜMLERİ ---
+# Etkileşimli bölgeler st.fragment olarak ayrılır: bir bölümdeki widget değişince
+# yalnızca o bölüm yeniden çalışır; tablo listesi, lokasyonlar ve sayfanın geri
+# kalanı tekrar okunmaz. Bölümler ihtiyaç duydukları veriyi parametre olarak alır.
+@st.fragment
+@olculen("Tablo Görüntüleme / tablo")
+def tablo_gorunumu(tablo):
+    c_mod, c_boyut = st.columns([3, 1])
+    with c_mod: mod = st.radio("Görünüm:", ["Sayfalı", "Tümü"], horizontal=True)
+    if mod == "Sayfalı":
+        with c_boyut: boyut = st.selectbox("Sayfa Boyutu:", SAYFA_BOYUTLARI)
+        # Her sayfanın başlangıç imleci; geri gitmek için yığın olarak tutulur
+        imlecler = st.session_state.setdefault(f"sayfa_{tablo}_{boyut}", [None])
+        toplam = get_table_count(tablo)
+        satirlar, sonraki = get_table_page(tablo, boyut, imlecler[-1])
+        if not satirlar and len(imlecler) > 1:
+            # Tablo küçüldüyse ilk sayfaya dön
+            imlecler[:] = [None]
+            satirlar, sonraki = get_table_page(tablo, boyut, None)
+        if satirlar:
+            st.info(f"{t('total_records')} {toplam}  |  Sayfa {len(imlecler)} / {max(1, -(-toplam // boyut))}")
+            st.dataframe(pd.DataFrame(satirlar), use_container_width=True)
+            n1, n2 = st.columns(2)
+            # İmleç geri çağırmada değişir; bölüm yeni sayfayla tek kez çalışır
+            with n1: st.button("◀ Geri", disabled=len(imlecler) == 1, use_container_width=True, on_click=imlecler.pop)
+            with n2: st.button("İleri ▶", disabled=sonraki is None, use_container_width=True, on_click=imlecler.append, args=(sonraki,))
+            if sonraki: get_table_page(tablo, boyut, sonraki, bekle=False)
+        else: st.warning(t("warning_empty"))
+    else:
+        df = get_table_df(tablo)
+        if not df.empty: 
+            st.info(f"{t('total_records')} {len(df)}")
+            st.dataframe(df, use_container_width=True)
+        else: st.warning(t("warning_empty"))
+
+@st.fragment
+@olculen("Arama & Filtreleme / arama")
+def arama_bolumu(secilen_tablo, user_role):
+    # Sütun listesi ilk sayfa ile şema kaydının birleşimidir; yalnızca sonraki
+    # dokümanlarda bulunan (yüklenen farklı sayfalardan gelen) sütunlar da
+    # aranabilir kalır. Tablonun tamamı filtre yoksa okunur.
+    ornek, _ = get_table_page(secilen_tablo, SAYFA_BOYUTLARI[0])
+    adaylar = [k for r in ornek for k in r] + get_sema_defteri().sutunlar(secilen_tablo)
+    cols = list(dict.fromkeys(k for k in adaylar if "Unnamed" not in str(k) and k != "Dokuman_ID"))
+    if cols:
+        with st.expander("🎯 Filtreler"):
+            filtreler = []
+            for i in range(3):
+                f1, f2, f3 = st.columns([2, 1, 2])
+                with f1: f_sutun = st.selectbox(f"Sütun {i + 1}", ["-"] + cols, key=f"filtre_sutun_{i}")
+                with f2: f_op = st.selectbox("Koşul", list(FILTRE_OPERATORLERI), key=f"filtre_op_{i}")
+                with f3: f_deger = st.text_input("Değer", key=f"filtre_deger_{i}")
+                if f_sutun != "-" and f_deger:
+                    op = FILTRE_OPERATORLERI[f_op]
+                    # Eşitlik sorguları saklanan tiple eşleşmeli
+                    tip = get_sema(secilen_tablo).get(f_sutun)
+                    if op == "in": f_deger = [deger_donustur(v.strip(), tip) for v in f_deger.split(",") if v.strip()]
+                    elif op == "==": f_deger = deger_donustur(f_deger, tip)
+                    filtreler.append((f_sutun, op, f_deger))
+        c1, c2 = st.columns(2)
+        with c1:
+            varsayilan = [c for c in ARAMA_SUTUNLARI if c in cols][:1] or cols[:1]
+            secilen_sutunlar = st.multiselect(t("col_search"), cols, default=varsayilan)
+        with c2:
+            aranan = st.text_input(t("val_search"))
+        c3, c4 = st.columns(2)
+        with c3: esleme = st.radio("Terimler:", ["VE", "VEYA"], horizontal=True)
+        with c4: tam_kelime = st.checkbox("Tam kelime")
+        if filtreler:
+            plan = sorgu_plani(secilen_tablo, filtreler)
+            try:
+                res = sorgu_calistir(secilen_tablo, plan)
+            except Exception as e:
+                # Çoğunlukla eksik bileşik indeks; sonuç yine de istemcide üretilir
+                st.warning(f"Sunucu sorgusu çalışmadı, istemci tarafında filtreleniyor. ({e})")
+                res = filtre_uygula(get_table_df(secilen_tablo), filtreler)
+            if aranan and secilen_sutunlar:
+                res = metin_filtrele(res, secilen_sutunlar, aranan.split(), esleme == "VE", tam_kelime)
+            st.success(f"{len(res)} {t('res_found')}")
+            st.dataframe(res, use_container_width=True)
+            with st.expander("🧭 Sorgu Planı"):
+                st.write(f"Sunucu: {[f'{a} {o} {d}' for a, o, d in plan['sunucu']]}")
+                st.write(f"İstemci: {[f'{a} {o} {d}' for a, o, d in plan['istemci']]}")
+                if plan["indeksler"]:
+                    st.caption("Gerekli bileşik indeks (firestore.indexes.json):")
+                    st.code(json.dumps({"indexes": plan["indeksler"], "fieldOverrides": []}, ensure_ascii=False, indent=2), language="json")
+        else:
+            df = get_table_df(secilen_tablo)
+            if aranan and secilen_sutunlar:
+                try:
+                    ids = get_arama_havuzu().get(secilen_tablo).sorgula(df, secilen_sutunlar, aranan.split(), esleme == "VE", tam_kelime)
+                    res = df[df['Dokuman_ID'].isin(ids)]
+                    st.success(f"{len(res)} {t('res_found')}")
+                    st.dataframe(res, use_container_width=True)
+                except: st.error(t("error"))
+                if user_role == "admin":
+                    with st.expander("⏱️ Performans Karşılaştırması"):
+                        if st.button("Ölç (100.000 satır)"):
+                            st.table(pd.DataFrame([arama_benchmark(df, secilen_sutunlar[0], aranan.split()[0])]))
+            else: st.dataframe(df, use_container_width=True)
+    else: st.warning(t("warning_empty"))
+
+@st.fragment
+@olculen("Makine Transferi / iade")
+def iade_bolumu():
+    try: acik = acik_transferler()
+    except gcp_exceptions.FailedPrecondition: acik = []
+    if acik:
+        st.subheader(t("transfer_log_title"))
+        st.caption(f"Açık transferler: {len(acik)}" + (f" (ilk {ACIK_TRANSFER_MAX})" if len(acik) == ACIK_TRANSFER_MAX else "") + ". İade edilenler arşive taşınır; arşiv aşağıdan ay ay açılabilir.")
+        df_acik = pd.DataFrame(acik)
+        df_acik.insert(0, "İade", False)
+        iade_sec = st.data_editor(df_acik, column_config={"İade": st.column_config.CheckboxColumn(default=False)}, disabled=[c for c in df_acik.columns if c != 'İade'], hide_index=True, use_container_width=True, key="iade_editor")
+        iadeler = iade_sec[iade_sec['İade'] == True]
+        if not iadeler.empty and st.button(f"İade Al ({len(iadeler)})"):
+            prog = st.progress(0)
+            try:
+                sonuc = transfer_iade(iadeler.to_dict('records'), lambda n, toplam: prog.progress(n / toplam))
+                for tablo, degisenler in sonuc["tablolar"].items(): invalidate_table(tablo, degisenler=degisenler)
+                invalidate_table('transfer_loglari')
+                uyari_ozeti_olustur()
+                st.success(f"{t('success')} {sonuc['transfer']} transfer kapatıldı, {sonuc['donen']} makine kaynak lokasyonuna döndü ({sonuc['commit']} commit).")
+                log_kayit_ekle("TRANSFER", "transfer_return", f"{sonuc['transfer']} Transfer İade Alındı", f"{sonuc['donen']} makine kaynağa döndü", tablo='transfer_loglari')
+            except Exception as e: st.error(f"{t('error')} {e}")
+
+@st.fragment
+@olculen("Makine Transferi / lokasyonlar")
+def lokasyon_yonetimi():
+    with st.expander(t("loc_mgmt")):
+        loc_list = get_locations()
+        c1, c2 = st.columns(2)
+        with c1:
+            nl = st.text_input(t("new_loc"))
+            if st.button(t("add")) and add_location(nl): st.rerun()
+        with c2:
+            dl = st.selectbox(t("delete"), loc_list)
+            if st.button(t("delete")) and remove_location(dl): st.rerun()
+
+@st.fragment
+@olculen("Makine Transferi / seçim")
+def transfer_bolumu(target):
+    secim_modu = st.radio("Seçim:", ["Tablodan seç", "Seri No listesi"], horizontal=True)
+    secilenler = []
+    if secim_modu == "Seri No listesi":
+        st.caption("Seri numaralarını satır, virgül ya da noktalı virgülle ayırarak yapıştırın veya dosya yükleyin (txt / csv / xlsx; 'Seri No' sütunu ya da ilk sütun).")
+        l1, l2 = st.columns(2)
+        with l1: yapistirilan = st.text_area("Seri No listesi:", height=150)
+        with l2: seri_dosyasi = st.file_uploader("Liste dosyası:", type=["txt", "csv", "xlsx", "xls"])
+        seriler = list(dict.fromkeys(seri_listesi_ayristir(yapistirilan) + (seri_dosyasi_oku(seri_dosyasi) if seri_dosyasi else [])))
+        # Eşleştirme sonucu liste değişene kadar oturumda tutulur; tarih / lokasyon seçimi yeniden sorgulamaz
+        liste_anahtari = hashlib.md5(f"{target}|{'|'.join(seriler)}".encode()).hexdigest()
+        cozum = st.session_state.get("toplu_transfer")
+        if seriler and st.button(f"Eşleştir ({len(seriler)} seri no)"):
+            t0 = time.perf_counter()
+            makineler, bulunamayan, coklu = seri_nolari_coz(target, seriler)
+            cozum = st.session_state["toplu_transfer"] = {"anahtar": liste_anahtari, "makineler": makineler, "bulunamayan": bulunamayan, "coklu": coklu, "sure": time.perf_counter() - t0}
+        if cozum and cozum["anahtar"] == liste_anahtari:
+            st.info(f"Eşleşen makine: {len(cozum['makineler'])} | Bulunamayan: {len(cozum['bulunamayan'])} | {cozum['sure']:.2f} sn")
+            if cozum["coklu"]: st.warning(f"Birden fazla makineyle eşleşen seri no ({len(cozum['coklu'])}); hepsi transfer edilir: {', '.join(cozum['coklu'][:20])}")
+            if cozum["bulunamayan"]:
+                with st.expander(f"Bulunamayan seri numaraları ({len(cozum['bulunamayan'])})"):
+                    st.dataframe(pd.DataFrame({"Seri No": cozum["bulunamayan"]}), hide_index=True)
+                    st.download_button("Listeyi İndir", data="\n".join(cozum["bulunamayan"]), file_name="Bulunamayan_Seri_No.txt")
+            secilenler = cozum["makineler"]
+    else:
+        filtre_secimi = filtreli_secim(target, "transfer")
+        if filtre_secimi and not filtre_secimi["df"].empty:
+            if st.checkbox(f"Eşleşen tüm kayıtları seç ({filtre_secimi['sayi']})", key=f"transfer_tumu_{target}"):
+                secilenler = sorgu_eslesenleri(target, filtre_secimi["sunucu"], ["Seri No", "Lokasyon"])
+            else:
+                df = filtre_secimi["df"]
+                df.insert(1, "Seç", False)
+                if 'Lokasyon' not in df.columns: df['Lokasyon'] = "-"
+                cols = ['Seç', 'Lokasyon'] + [c for c in df.columns if c not in ['Seç', 'Lokasyon', 'Dokuman_ID']]
+                edited = st.data_editor(df[cols + ['Dokuman_ID']], column_config={"Seç": st.column_config.CheckboxColumn(default=False), "Dokuman_ID": st.column_config.TextColumn(disabled=True), "Lokasyon": st.column_config.TextColumn(disabled=True)}, disabled=[c for c in df.columns if c != 'Seç'], hide_index=True, use_container_width=True)
+                secilenler = edited[edited['Seç'] == True].to_dict('records')
+        elif filtre_secimi: st.warning(t("warning_empty"))
+
+    if secilenler:
+        st.info(f"{t('select_rows')} {len(secilenler)}")
+        # Tarih / lokasyon değişiklikleri gönderilene kadar yeniden çalıştırma tetiklemez
+        with st.form("transfer_formu"):
+            c_d1, c_d2, c_l = st.columns(3)
+            with c_d1: gt = st.date_input(t("date_send"), datetime.date.today())
+            with c_d2: dt = st.date_input(t("date_return"), datetime.date.today() + datetime.timedelta(days=7))
+            with c_l: tl = st.selectbox(t("target_loc"), get_locations())
+            gonder = st.form_submit_button(t("transfer_btn"))
+        sure = (dt - gt).days
+        if gonder:
+            if sure < 0: st.error(t("err_date"))
+            else:
+                # İş verisinde yalnızca transferin kullandığı alanlar tutulur
+                makineler = [{"Dokuman_ID": m['Dokuman_ID'], "Seri No": fs_deger(m.get('Seri No')), "Lokasyon": fs_deger(m.get('Lokasyon'))} for m in secilenler]
+                veri = {"tablo": target, "makineler": makineler, "hedef": tl, "gonderim": gt, "geri_alim": dt, "seri_listesi": secim_modu == "Seri No listesi"}
+                # Aynı formun ikinci gönderimi ilk iş sürerken reddedilir
+                imza = hashlib.md5(f"{target}|{'|'.join(sorted(m['Dokuman_ID'] for m in makineler))}|{tl}|{gt}|{dt}".encode()).hexdigest()
+                if is_gonder("transfer", f"Transfer: {target}, {len(makineler)} makine → {tl} ({sure} gün)", veri, anahtar=f"transfer:{imza}"):
+                    # Eşleştirmedeki lokasyonlar artık eski; liste yeniden eşleştirilmeli
+                    st.session_state.pop("toplu_transfer", None)
+                    st.rerun()
+
+@st.fragment
+@olculen("Kayıt Silme / seçim")
+def silme_bolumu(target):
+    filtre_secimi = filtreli_secim(target, "sil")
+    if filtre_secimi and not filtre_secimi["df"].empty:
+        # Anahtar tabloya bağlıdır; tablo değişince işaret yeni tabloya taşınmaz
+        if st.checkbox(f"Eşleşen tüm kayıtları seç ({filtre_secimi['sayi']})", key=f"sil_tumu_{target}"):
+            # Rapor özetini düzeltmek için özet sütunları da okunur
+            silinecekler = sorgu_eslesenleri(target, filtre_secimi["sunucu"], OZET_SUTUNLARI)
+        else:
+            df = filtre_secimi["df"]
+            df.insert(1, "Seç", False)
+            cols = ['Seç'] + [c for c in df.columns if c != 'Seç']
+            edited = st.data_editor(df[cols], column_config={"Seç": st.column_config.CheckboxColumn(default=False), "Dokuman_ID": st.column_config.TextColumn(disabled=True)}, disabled=[c for c in df.columns if c != 'Seç'], hide_index=True, use_container_width=True)
+            silinecekler = edited[edited['Seç']==True].to_dict('records')
+        if silinecekler:
+            st.error(f"{t('select_rows')} {len(silinecekler)}")
+            if st.button(t("del_selected")):
+                if len(silinecekler) > SILME_IS_ESIGI:
+                    # Büyük seçimler script thread'inde değil arka plan işinde silinir; aynı seçim iki kez gönderilemez
+                    kayitlar = [{"Dokuman_ID": r['Dokuman_ID'], **{s: fs_deger(r.get(s)) for s in OZET_SUTUNLARI}} for r in silinecekler]
+                    imza = hashlib.md5("|".join(sorted(r["Dokuman_ID"] for r in kayitlar)).encode()).hexdigest()
+                    if is_gonder("kayit_sil", f"Kayıt silme: {target}, {len(kayitlar)} kayıt", {"tablo": target, "kayitlar": kayitlar}, anahtar=f"kayit_sil:{target}:{imza}"):
+                        st.session_state.pop(f"sil_tumu_{target}", None)
+                        st.rerun()
+                    return
+                prog = st.progress(0)
+                ids = [r['Dokuman_ID'] for r in silinecekler]
+                parcalar = ([db.collection(target).document(i) for i in ids[k:k + OZETLI_BATCH]] for k in range(0, len(ids), OZETLI_BATCH))
+                farklar = {r['Dokuman_ID']: ozet_farki(r, None) for r in silinecekler}
+                silinen, hiz = toplu_sil(parcalar, ilerleme=lambda n, h: prog.progress(min(n / len(ids), 1.0), text=f"{n}/{len(ids)} • {h:.0f} doküman/sn"), ozet_farklari=farklar)
+                invalidate_table(target, silinenler=ids)
+                st.success(t("success"))
+                log_kayit_ekle("SİLME", "delete", f"{len(silinecekler)} Kayıt Silindi", f"Tablo: {target}", tablo=target)
+                st.rerun()
+
+@st.fragment
+@olculen("Raporlar / grafik")
+def rapor_grafikleri(ozet):
+    st.write(f"{t('total_records')} {ozet.get('toplam', 0)}")
+    c1, c2 = st.columns(2)
+    with c1:
+        sutun = st.selectbox("Grupla:", OZET_SUTUNLARI)
+        st.bar_chart(ozet_serisi(ozet, sutun))
+    with c2: st.bar_chart(ozet_serisi(ozet, 'Versiyon'), horizontal=True)
+
+@st.fragment
+@olculen("Raporlar / tam analiz")
+def tam_analiz(tablo):
+    # Düğme durumu oturumda tutulur; gruplama değişince analiz kaybolmaz
+    if st.button("Analiz Et (tüm sütunlar, tam tarama)"): st.session_state["tam_analiz"] = tablo
+    if st.session_state.get("tam_analiz") == tablo:
+        df = get_table_df(tablo).drop(columns=['Dokuman_ID'], errors='ignore')
+        if not df.empty:
+            df = df.fillna("-")
+            st.write(f"{t('total_records')} {len(df)}")
+            sutun = st.selectbox("Grupla:", df.columns, key="tam_grupla")
+            if sutun: st.bar_chart(df[sutun].value_counts())
+
+@st.fragment
+@olculen("Log Kayıtları / liste")
+def log_bolumu():
+    depo = get_log_deposu()
+    f1, f2, f3 = st.columns(3)
+    with f1: aralik = st.date_input("Tarih Aralığı:", (datetime.date.today() - datetime.timedelta(days=30), datetime.date.today()))
+    with f2: kullanici = st.selectbox("Kullanıcı:", ["Tümü"] + depo.farkli("kullanici"))
+    with f3: islem_turleri = st.multiselect("İşlem Türü:", depo.farkli("islem_turu"))
+    f4, f5, f6 = st.columns([2, 3, 1])
+    with f4: log_tablo = st.selectbox("Tablo:", ["Tümü"] + depo.farkli("tablo"))
+    with f5: metin = st.text_input("Mesajda Ara:")
+    with f6: boyut = st.selectbox("Sayfa Boyutu:", SAYFA_BOYUTLARI, index=1)
+    filtre = {
+        "baslangic": datetime.datetime.combine(aralik[0], datetime.time()).timestamp() if len(aralik) > 0 else None,
+        "bitis": datetime.datetime.combine(aralik[-1] + datetime.timedelta(days=1), datetime.time()).timestamp() if len(aralik) > 0 else None,
+        "kullanici": None if kullanici == "Tümü" else kullanici,
+        "islem_turleri": islem_turleri,
+        "tablo": None if log_tablo == "Tümü" else log_tablo,
+        "metin": metin.strip(),
+    }
+    # Filtre değişince imleç yığını sıfırlanır
+    imlec_anahtari = "log_imlec_" + hashlib.md5(repr(sorted(filtre.items())).encode()).hexdigest() + f"_{boyut}"
+    imlecler = st.session_state.setdefault(imlec_anahtari, [None])
+    satirlar, sonraki = depo.sorgula(filtre, imlecler[-1], boyut)
+    if satirlar:
+        st.dataframe(pd.DataFrame(satirlar).drop(columns=["id"]), use_container_width=True, hide_index=True)
+        n1, n2 = st.columns(2)
+        with n1: st.button("◀ Daha Yeni", disabled=len(imlecler) == 1, use_container_width=True, on_click=imlecler.pop)
+        with n2: st.button("Daha Eski ▶", disabled=sonraki is None, use_container_width=True, on_click=imlecler.append, args=(sonraki,))
+        e1, e2 = st.columns([1, 3])
+        with e1: bicim = st.radio("Biçim:", ["csv", "xlsx"] + (["parquet"] if parquet_destekli() else []), horizontal=True)
+        with e2:
+            if st.button("Dışa Aktarımı Hazırla"):
+                yol = os.path.join(tempfile.gettempdir(), f"Sistem_Loglari_{imlec_anahtari}.{bicim}")
+                satirlari_disa_aktar(yol, bicim, LOG_SUTUNLARI[1:], (r[1:] for r in depo.akit(filtre)))
+                with open(yol, "rb") as f:
+                    st.download_button(t("download_excel") if bicim == "xlsx" else f"{bicim.upper()} İndir", data=f, file_name=f"Sistem_Loglari.{bicim}", mime=DISA_AKTARMA_MIME[bicim], on_click="ignore")
+    else: st.info("Log yok.")
+
+IS_ETIKETLERI = {IS_BEKLIYOR: "⏳ Bekliyor", IS_CALISIYOR: "▶️ Çalışıyor", IS_TAMAM: "✅ Tamamlandı", IS_HATA: "❌ Hata", IS_IPTAL: "⏹ İptal edildi"}
+
+def is_gonder(tur, baslik, veri, anahtar=None):
+    is_id = get_is_yurutucu().gonder(tur, baslik, st.session_state["username"], veri, anahtar)
+    if is_id is None: st.warning("Aynı hedef için çalışan bir iş var; bitmesini bekleyin ya da iptal edin.")
+    else: st.success("İş başlatıldı; sayfadan ayrılsanız da arka planda devam eder. İlerlemeyi aşağıdan izleyebilirsiniz.")
+    return is_id
+
+def isler_alani(tur):
+    # Çalışan iş varken bölüm kendini yoklar; yöneticiler tüm kullanıcıların işlerini görür
+    kullanici = None if st.session_state["role"] == "admin" else st.session_state["username"]
+    yokla = get_is_yurutucu().canli_var(tur, kullanici)
+    st.fragment(_is_listesi, run_every=IS_YOKLAMA if yokla else None)(tur, kullanici)
+
+@olculen("Arka Plan İşleri")
+def _is_listesi(tur, kullanici):
+    yurutucu = get_is_yurutucu()
+    # Yoklama bellekteki durumu okur; liste yalnızca canlı iş kümesi değişince
+    # (iş başladı, bitti, devam ettirildi) Firestore'dan yeniden sorgulanır
+    canlilar = yurutucu.canli_isler(tur, kullanici)
+    onceki, kayitlar = st.session_state.get(f"is_liste_{tur}", (frozenset(), None))
+    if kayitlar is None or onceki != canlilar:
+        try: kayitlar = is_kayitlari(tur, kullanici)
+        except gcp_exceptions.FailedPrecondition:
+            st.error("İş listesi için bileşik indeks gerekiyor (bkz. firestore.indexes.json).")
+            return
+        st.session_state[f"is_liste_{tur}"] = (canlilar, kayitlar)
+    if not kayitlar: return
+    st.subheader("⚙️ Arka Plan İşleri")
+    for k in map(dict, kayitlar):
+        canli = yurutucu.canli(k["id"])
+        if canli: k.update(canli)
+        elif k.get("durum") in IS_AKTIF: k["durum"] = None     # süreç yeniden başlamış; iş yarım kaldı
+        with st.container(border=True):
+            c1, c2 = st.columns([5, 1])
+            with c1:
+                etiket = IS_ETIKETLERI.get(k["durum"], "⚠️ Yarım kaldı") + (" (iptal ediliyor)" if k.get("iptal") else "")
+                oran = min(k.get("islenen", 0) / k["toplam"], 1.0) if k.get("toplam") else (1.0 if k["durum"] == IS_TAMAM else 0.0)
+                st.progress(oran, text=f"{k.get('baslik', k['id'])} • {etiket} • {k.get('islenen', 0)}" + (f"/{k['toplam']}" if k.get("toplam") else "") + f" • {k.get('hiz') or 0:.0f}/sn")
+                st.caption(f"{k.get('kullanici', '-')} • {k['olusturma']:%d.%m.%Y %H:%M}" + (f" • {k['hata']}" if k.get("hata") else "")
+                           + (" • " + ", ".join(f"{a}: {v}" for a, v in k["sonuc"].items()) if k.get("sonuc") and k["durum"] == IS_TAMAM else ""))
+            with c2:
+                if canli: st.button("İptal", key=f"is_iptal_{k['id']}", disabled=canli["iptal"], on_click=yurutucu.iptal_et, args=(k["id"],), use_container_width=True)
+                elif k["durum"] != IS_TAMAM and yurutucu.devam_edebilir(k["id"]):
+                    if st.button("Devam Et", key=f"is_devam_{k['id']}", use_container_width=True) and yurutucu.devam_et(k["id"]): st.rerun()
+    # Biten iş varsa sayfa bir kez yenilenir; tablolar ve sayılar güncellenir, yoklama durur
+    if onceki - canlilar: st.rerun()
+
 # --- ANA UYGULAMA ---
 def main():
     if "logged_in" not in st.session_state:
@@ -508,15 +2935,12 @@ def main():
         # 1. TABLO GÖRÜNTÜLEME
         if secim == "Tablo Görüntüleme":
             st.header(t("menu_view"))
+            if st.button("↻ Tablo listesini ve sayıları yenile"): get_katalog().yenile()
             tablolar = get_table_list()
             if tablolar:
                 tablo = st.selectbox(t("select_table"), tablolar)
-                docs = list(db.collection(tablo).stream())
-                data = [{"Dokuman_ID": doc.id, **doc.to_dict()} for doc in docs]
-                if data: 
-                    st.info(f"{t('total_records')} {len(data)}")
-                    st.dataframe(pd.DataFrame(data), use_container_width=True)
-                else: st.warning(t("warning_empty"))
+                tablo_gorunumu(tablo)
+                makine_gecmisi_alani(tablo, "gor")
             else: st.warning(t("warning_no_table"))
 
         # 2. ARAMA VE FİLTRELEME
@@ -525,106 +2949,68 @@ def main():
             tablolar = get_table_list()
             if tablolar:
                 secilen_tablo = st.selectbox(t("select_table"), tablolar)
-                docs = db.collection(secilen_tablo).stream()
-                data = [{"Dokuman_ID": doc.id, **doc.to_dict()} for doc in docs]
-                if data:
-                    df = pd.DataFrame(data)
-                    c1, c2 = st.columns(2)
-                    with c1:
-                        cols = [c for c in df.columns if "Unnamed" not in str(c) and c != "Dokuman_ID"]
-                        secilen_sutun = st.selectbox(t("col_search"), cols)
-                    with c2:
-                        aranan = st.text_input(t("val_search"))
-                    if aranan:
-                        try:
-                            res = df[df[secilen_sutun].astype(str).str.contains(aranan, case=False, na=False)]
-                            st.success(f"{len(res)} {t('res_found')}")
-                            st.dataframe(res, use_container_width=True)
-                        except: st.error(t("error"))
-                    else: st.dataframe(df, use_container_width=True)
+                arama_bolumu(secilen_tablo, user_role)
             else: st.warning(t("warning_no_table"))
 
         # 3. MAKİNE TRANSFERİ
         elif secim == "Makine Transferi":
             st.header(t("menu_transfer"))
             
-            transfer_docs = list(db.collection('transfer_loglari').stream())
-            transfer_data = [d.to_dict() for d in transfer_docs]
-            if transfer_data:
-                df_transfer = pd.DataFrame(transfer_data)
-                bugun = datetime.date.today()
-                df_transfer['Geri_Alim_Tarihi'] = pd.to_datetime(df_transfer['Geri_Alim_Tarihi']).dt.date
-                
-                gecikenler = df_transfer[df_transfer['Geri_Alim_Tarihi'] < bugun]
-                yaklasanlar = df_transfer[(df_transfer['Geri_Alim_Tarihi'] > bugun) & (df_transfer['Geri_Alim_Tarihi'] <= bugun + datetime.timedelta(days=3))]
-                
+            try:
+                uyari = get_uyari_ozeti()
                 uc1, uc2 = st.columns(2)
-                if not gecikenler.empty:
-                    uc1.error(f"{t('late_alert')} {len(gecikenler)}")
-                    with uc1.expander("Detay"): st.dataframe(gecikenler[['Makine_Info', 'Hedef_Lokasyon']])
-                if not yaklasanlar.empty:
-                    uc2.info(f"{t('soon_alert')} {len(yaklasanlar)}")
-                
-                st.subheader(t("transfer_log_title"))
-                st.dataframe(df_transfer, use_container_width=True)
-                
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer) as writer: df_transfer.to_excel(writer, index=False)
-                st.download_button(t("download_excel"), data=buffer.getvalue(), file_name="Transfer_Log.xlsx", mime="application/vnd.ms-excel")
-                st.divider()
-
-            with st.expander(t("loc_mgmt")):
-                loc_list = get_locations()
-                c1, c2 = st.columns(2)
-                with c1:
-                    nl = st.text_input(t("new_loc"))
-                    if st.button(t("add")) and add_location(nl): st.rerun()
-                with c2:
-                    dl = st.selectbox(t("delete"), loc_list)
-                    if st.button(t("delete")) and remove_location(dl): st.rerun()
+                if uyari["geciken"]:
+                    uc1.error(f"{t('late_alert')} {uyari['geciken']}")
+                    with uc1.expander("Detay"):
+                        st.dataframe(pd.DataFrame(uyari["gecikenler"])[['Makine_Info', 'Hedef_Lokasyon', 'Geri_Alim_Tarihi']], hide_index=True)
+                        if uyari["geciken"] > len(uyari["gecikenler"]): st.caption(f"İlk {len(uyari['gecikenler'])} kayıt gösteriliyor.")
+                if uyari["yaklasan"]:
+                    uc2.info(f"{t('soon_alert')} {uyari['yaklasan']}")
+                    with uc2.expander("Detay"): st.dataframe(pd.DataFrame(uyari["yaklasanlar"])[['Makine_Info', 'Hedef_Lokasyon', 'Geri_Alim_Tarihi']], hide_index=True)
+                if st.button("↻ Uyarıları Yenile"):
+                    uyari_ozeti_olustur()
+                    st.rerun()
+            except gcp_exceptions.FailedPrecondition as e:
+                st.warning(f"Transfer uyarıları için bileşik indeks eksik (firestore.indexes.json dağıtılmalı): {e}")
+
+            iade_bolumu()
+            
+            disa_aktarma_alani('transfer_loglari', "Transfer_Log")
+            if user_role == "admin":
+                with st.expander("🛠 Eski Transfer Kayıtlarını Dönüştür"):
+                    st.caption("Metin olarak saklanan tarihleri zaman damgasına çevirir ve durumu olmayan kayıtları açık transfer olarak işaretler. Bir kez çalıştırmak yeterlidir.")
+                    if st.button("Dönüştür"):
+                        prog = st.progress(0)
+                        n = transfer_kayitlarini_donustur(lambda k, toplam: prog.progress(k / toplam))
+                        invalidate_table('transfer_loglari')
+                        uyari_ozeti_olustur()
+                        st.success(f"{t('success')} {n} kayıt dönüştürüldü.")
+                        log_kayit_ekle("TRANSFER", "transfer_migrate", "Transfer Kayıtları Dönüştürüldü", f"{n} kayıt", tablo='transfer_loglari')
+                with st.expander("🗄 Arşivleme"):
+                    is_doc = db.collection('system_jobs').document('arsiv_transfer').get()
+                    if is_doc.exists:
+                        is_ = is_doc.to_dict()
+                        st.caption(f"Son arşivleme: {is_.get('durum')} • {is_.get('tasinan', 0)} kayıt • {is_.get('guncelleme')}" + (f" • {is_['hata']}" if is_.get('durum') == "hata" else ""))
+                    st.caption(f"İadesinden {ARSIV_BEKLEME_GUN} gün geçen transferler her gün otomatik taşınır.")
+                    if st.button("Arşivlemeyi Şimdi Başlat"):
+                        st.info("Arşivleme arka planda başlatıldı." if arsivlemeyi_baslat() else "Arşivleme zaten çalışıyor.")
+            with st.expander("📚 Transfer Arşivi"):
+                aylar = arsiv_aylari()
+                if aylar:
+                    ay = st.selectbox("Ay:", [a["ay"] for a in aylar], format_func=lambda a: f"{a} ({next((x.get('kayit', 0) for x in aylar if x['ay'] == a), 0)} kayıt)")
+                    if st.button("Arşivi Göster"):
+                        st.dataframe(pd.DataFrame(arsiv_kayitlari(ay)).drop(columns=['Dokuman_ID'], errors='ignore'), use_container_width=True)
+                else: st.caption("Arşivde kayıt yok.")
+            st.divider()
+
+            lokasyon_yonetimi()
             
             tablolar = get_table_list()
             if tablolar:
                 target = st.selectbox(t("select_table"), tablolar)
-                docs = db.collection(target).stream()
-                data = [{"Dokuman_ID": doc.id, "Seç": False, **doc.to_dict()} for doc in docs]
-                if data:
-                    df = pd.DataFrame(data)
-                    if 'Lokasyon' not in df.columns: df['Lokasyon'] = "-"
-                    cols = ['Seç', 'Lokasyon'] + [c for c in df.columns if c not in ['Seç', 'Lokasyon', 'Dokuman_ID']]
-                    edited = st.data_editor(df[cols + ['Dokuman_ID']], column_config={"Seç": st.column_config.CheckboxColumn(default=False), "Dokuman_ID": st.column_config.TextColumn(disabled=True), "Lokasyon": st.column_config.TextColumn(disabled=True)}, disabled=[c for c in df.columns if c != 'Seç'], hide_index=True, use_container_width=True)
-                    
-                    sel = edited[edited['Seç'] == True]
-                    if not sel.empty:
-                        st.info(f"{t('select_rows')} {len(sel)}")
-                        c_d1, c_d2, c_l = st.columns(3)
-                        with c_d1: gt = st.date_input(t("date_send"), datetime.date.today())
-                        with c_d2: dt = st.date_input(t("date_return"), datetime.date.today() + datetime.timedelta(days=7))
-                        with c_l: tl = st.selectbox(t("target_loc"), get_locations())
-                        
-                        sure = (dt - gt).days
-                        if sure < 0: st.error(t("err_date"))
-                        else:
-                            st.write(f"{t('duration')} **{sure}**")
-                            if st.button(t("transfer_btn")):
-                                prog = st.progress(0)
-                                cnt = 0
-                                for i, r in sel.iterrows():
-                                    db.collection(target).document(r['Dokuman_ID']).update({'Lokasyon': tl})
-                                    log_ref = db.collection('transfer_loglari').document()
-                                    log_ref.set({
-                                        "Makine_ID": r['Dokuman_ID'],
-                                        "Makine_Info": r.get('Seri No', r['Dokuman_ID']),
-                                        "Hedef_Lokasyon": tl,
-                                        "Gonderim_Tarihi": str(gt),
-                                        "Geri_Alim_Tarihi": str(dt),
-                                        "Transfer_Eden": st.session_state["username"]
-                                    })
-                                    cnt+=1
-                                    prog.progress(cnt/len(sel))
-                                st.success(t("transfer_success"))
-                                st.rerun()
-                else: st.warning(t("warning_empty"))
+                transfer_bolumu(target)
+                isler_alani("transfer")
+                makine_gecmisi_alani(target, "transfer")
 
         # 4. YENİ KAYIT EKLEME
         elif secim == "Yeni Kayıt Ekle":
@@ -632,27 +3018,33 @@ def main():
             tablolar = get_table_list()
             if tablolar:
                 target = st.selectbox(t("select_table"), tablolar)
-                doc_id = st.text_input("ID (Opsiyonel):")
-                c1, c2 = st.columns(2)
-                with c1:
-                    seri = st.text_input("Seri No")
-                    dept = st.text_input("Departman")
-                    lok = st.selectbox("Lokasyon", get_locations())
-                    kul = st.text_input("Kullanıcı")
-                    pcid = st.text_input("PC ID")
-                with c2:
-                    pcad = st.text_input("PC Adı")
-                    ver = st.text_input("Versiyon")
-                    durum = st.text_input("Son Durum")
-                    notlar = st.text_input("Notlar")
-                    icerik = st.text_input("İçerik")
-                if st.button(t("save")):
-                    data = {"Seri No": seri, "Departman": dept, "Lokasyon": lok, "Kullanıcı": kul, "Kullanıcı PC ID": pcid, "Kullanıcı PC Adı": pcad, "Versiyon": ver, "Son Durum": durum, "Notlar": notlar, "İçerik": icerik, "Kayit_Tarihi": datetime.datetime.now().strftime("%d.%m.%Y")}
+                with st.form("kayit_ekle"):
+                    doc_id = st.text_input("ID (Opsiyonel):")
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        seri = st.text_input("Seri No")
+                        dept = st.text_input("Departman")
+                        lok = st.selectbox("Lokasyon", get_locations())
+                        kul = st.text_input("Kullanıcı")
+                        pcid = st.text_input("PC ID")
+                    with c2:
+                        pcad = st.text_input("PC Adı")
+                        ver = st.text_input("Versiyon")
+                        durum = st.text_input("Son Durum")
+                        notlar = st.text_input("Notlar")
+                        icerik = st.text_input("İçerik")
+                    kaydet = st.form_submit_button(t("save"))
+                if kaydet:
+                    data = {"Seri No": seri, "Departman": dept, "Lokasyon": lok, "Kullanıcı": kul, "Kullanıcı PC ID": pcid, "Kullanıcı PC Adı": pcad, "Versiyon": ver, "Son Durum": durum, "Notlar": notlar, "İçerik": icerik, "Kayit_Tarihi": datetime.date.today()}
+                    data = semayi_uygula(get_sema(target), data)
                     try:
-                        if doc_id: db.collection(target).document(doc_id).set(data)
-                        else: db.collection(target).add(data)
+                        # Verilen ID mevcut bir dokümanın üzerine yazabilir; eski hali sayımlardan düşülür
+                        ref = db.collection(target).document(doc_id) if doc_id else db.collection(target).document()
+                        eski = ref.get().to_dict() if doc_id else None
+                        toplu_yaz([("set", ref, data, ozet_farki(eski, data))])
+                        invalidate_table(target, degisenler={ref.id: data}, eklenen=int(eski is None))
                         st.success(t("success"))
-                        log_kayit_ekle("EKLEME", "add", f"Kayıt Eklendi", f"Tablo: {target}")
+                        log_kayit_ekle("EKLEME", "add", "Kayıt Eklendi", f"Tablo: {target}", tablo=target)
                     except Exception as e: st.error(f"{t('error')} {e}")
 
         # 5. KAYIT GÜNCELLEME
@@ -662,18 +3054,25 @@ def main():
             tablolar = get_table_list()
             if tablolar:
                 target = st.selectbox(t("select_table"), tablolar)
-                docs = db.collection(target).stream()
-                data = [{"Dokuman_ID": doc.id, **doc.to_dict()} for doc in docs]
-                if data:
-                    edited = st.data_editor(pd.DataFrame(data), num_rows="fixed", column_config={"Dokuman_ID": st.column_config.TextColumn(disabled=True)}, use_container_width=True)
-                    if st.button(t("save_changes")):
-                        prog = st.progress(0)
-                        for i, row in edited.iterrows():
-                            db.collection(target).document(row['Dokuman_ID']).set(row.drop('Dokuman_ID').to_dict(), merge=True)
-                            prog.progress((i+1)/len(edited))
-                        st.success(t("success"))
-                        log_kayit_ekle("GÜNCELLEME", "update", f"Tablo Güncellendi: {target}")
-                        st.rerun()
+                df = get_table_df(target)
+                if not df.empty:
+                    # Hücre düzenlemeleri kaydedilene kadar tarayıcıda kalır
+                    with st.form("kayit_guncelle"):
+                        edited = st.data_editor(df, num_rows="fixed", column_config={"Dokuman_ID": st.column_config.TextColumn(disabled=True)}, use_container_width=True)
+                        kaydet = st.form_submit_button(t("save_changes"))
+                    if kaydet:
+                        sema = get_sema(target)
+                        farklar = {doc_id: semayi_uygula(sema, alanlar, bos_sil=True) for doc_id, alanlar in satir_farklari(df, edited).items()}
+                        if farklar:
+                            eskiler = df.set_index('Dokuman_ID')
+                            islemler = []
+                            for doc_id, alanlar in farklar.items():
+                                eski, degerler = eskiler.loc[doc_id].to_dict(), indeks_degerleri(alanlar)
+                                islemler.append((doc_id, degerler, list(ozet_farki(eski, {**eski, **degerler}).items())))
+                            is_gonder("guncelleme", f"Güncelleme: {target}, {len(islemler)} doküman", {"tablo": target, "islemler": islemler})
+                        else: st.info("Değişiklik yok.")
+                    makine_gecmisi_alani(target, "guncelle")
+            isler_alani("guncelleme")
 
         # 6. KAYIT SİLME
         elif secim == "Kayıt Silme":
@@ -681,23 +3080,8 @@ def main():
             tablolar = get_table_list()
             if tablolar:
                 target = st.selectbox(t("select_table"), tablolar)
-                docs = db.collection(target).stream()
-                data = [{"Dokuman_ID": doc.id, "Seç": False, **doc.to_dict()} for doc in docs]
-                if data:
-                    df = pd.DataFrame(data)
-                    cols = ['Seç'] + [c for c in df.columns if c != 'Seç']
-                    edited = st.data_editor(df[cols], column_config={"Seç": st.column_config.CheckboxColumn(default=False), "Dokuman_ID": st.column_config.TextColumn(disabled=True)}, disabled=[c for c in df.columns if c != 'Seç'], hide_index=True, use_container_width=True)
-                    silinecekler = edited[edited['Seç']==True]
-                    if not silinecekler.empty:
-                        st.error(f"{t('select_rows')} {len(silinecekler)}")
-                        if st.button(t("del_selected")):
-                            prog = st.progress(0)
-                            for i, row in silinecekler.iterrows():
-                                db.collection(target).document(row['Dokuman_ID']).delete()
-                                prog.progress((i+1)/len(silinecekler))
-                            st.success(t("success"))
-                            log_kayit_ekle("SİLME", "delete", f"{len(silinecekler)} Kayıt Silindi", f"Tablo: {target}")
-                            st.rerun()
+                silme_bolumu(target)
+            isler_alani("kayit_sil")
 
         # 7. TABLO SİLME
         elif secim == "Tablo Silme":
@@ -706,77 +3090,69 @@ def main():
             tablolar = get_table_list()
             if tablolar:
                 target = st.selectbox(t("select_table"), tablolar)
-                docs = list(db.collection(target).stream())
-                st.warning(f"{t('total_records')} {len(docs)}")
-                if len(docs) > 0:
+                kayit_sayisi = get_table_count(target)
+                st.warning(f"{t('total_records')} {kayit_sayisi}")
+                if kayit_sayisi > 0:
                     if st.text_input(f"{t('confirm_del_table')} '{target}'") == target:
                         if st.button(t("delete")):
-                            prog = st.progress(0)
-                            for i, doc in enumerate(docs):
-                                doc.reference.delete()
-                                prog.progress((i+1)/len(docs))
-                            st.success(t("success"))
-                            log_kayit_ekle("KRITIK_SILME", "delete_table", f"Tablo Silindi: {target}")
-                            st.rerun()
+                            is_gonder("tablo_sil", f"Tablo silme: {target}", {"tablo": target, "toplam": kayit_sayisi}, anahtar=f"tablo_sil:{target}")
                 else:
                     if st.button("Boş Tabloyu Kaldır"):
+                        get_katalog().tablo_silindi(target)
                         st.success(t("success"))
                         st.rerun()
+            # Yarım kalan silme işleri buradan devam ettirilir
+            isler_alani("tablo_sil")
 
         # 8. EXCEL YÜKLEME
         elif secim == "Toplu Tablo Yükle (Excel)":
             st.header(t("menu_upload"))
+            with st.expander("🧬 Tablo Şeması"):
+                st.caption("Yükleme, ekleme ve güncellemede değerler bu tiplere çevrilir. Şeması olmayan sütunların tipi ilk yüklemede tahmin edilir.")
+                tablolar = get_table_list()
+                if tablolar:
+                    sema_tablo = st.selectbox(t("select_table"), tablolar, key="sema_tablo")
+                    sema = get_sema(sema_tablo)
+                    duzenlenen_sema = st.data_editor(pd.DataFrame({"Sütun": list(sema), "Tip": list(sema.values())}), column_config={"Tip": st.column_config.SelectboxColumn(options=SEMA_TIPLERI, required=True)}, num_rows="dynamic", hide_index=True, use_container_width=True, key=f"sema_{sema_tablo}")
+                    if st.button("Şemayı Kaydet"):
+                        get_sema_defteri().kaydet(sema_tablo, {r["Sütun"]: r["Tip"] for r in duzenlenen_sema.to_dict('records') if r["Sütun"] and r["Tip"]})
+                        st.success(t("success"))
             file = st.file_uploader("Dosya:", type=["xlsx", "xls"])
+            y1, y2 = st.columns(2)
+            with y1: yukleme_modu = st.radio("Mod:", ["Yeni doküman olarak ekle", "Anahtara göre güncelle / ekle"])
+            with y2: anahtar = st.text_input("Anahtar Sütun:", "Seri No", disabled=yukleme_modu == "Yeni doküman olarak ekle")
+            kuru = st.checkbox("Deneme (yazmadan say)")
             if file and st.button("Başlat"):
-                try:
-                    sheets = pd.read_excel(file, sheet_name=None)
-                    prog = st.progress(0)
-                    for i, (name, df) in enumerate(sheets.items()):
-                        st.write(f"Yükleniyor: {name}")
-                        df = df.dropna(how='all', axis=1).dropna(how='all', axis=0).fillna('None')
-                        df.columns = df.columns.astype(str).str.strip()
-                        batch = db.batch()
-                        count = 0
-                        for _, row in df.iterrows():
-                            batch.set(db.collection(name).document(), row.to_dict())
-                            count += 1
-                            if count % 400 == 0:
-                                batch.commit()
-                                batch = db.batch()
-                        batch.commit()
-                        prog.progress((i+1)/len(sheets))
-                    st.success(t("success"))
-                    log_kayit_ekle("YUKLEME", "upload", "Excel Yüklendi", f"Dosya: {file.name}")
-                except Exception as e: st.error(f"{t('error')} {e}")
+                anahtar = anahtar.strip() if yukleme_modu != "Yeni doküman olarak ekle" else None
+                is_gonder("yukleme", f"Excel yükleme: {file.name}" + (" (deneme, yazılmaz)" if kuru else ""), {"ad": file.name, "icerik": file.getvalue(), "anahtar": anahtar, "kuru": kuru})
+            isler_alani("yukleme")
 
         # 9. RAPORLAR
         elif secim == "Raporlar":
             st.header(t("menu_report"))
             tablo = st.selectbox(t("select_table"), get_table_list())
-            if st.button("Analiz Et"):
-                docs = db.collection(tablo).stream()
-                data = [doc.to_dict() for doc in docs]
-                if data:
-                    df = pd.DataFrame(data).fillna("-")
-                    st.write(f"{t('total_records')} {len(df)}")
-                    c1, c2 = st.columns(2)
-                    with c1:
-                        sutun = st.selectbox("Grupla:", df.columns)
-                        if sutun: st.bar_chart(df[sutun].value_counts())
-                    with c2:
-                        if 'Versiyon' in df.columns:
-                            st.bar_chart(df['Versiyon'].value_counts(), horizontal=True)
-                    import io
-                    buff = io.BytesIO()
-                    with pd.ExcelWriter(buff) as writer: df.to_excel(writer, index=False)
-                    st.download_button(t("download_excel"), data=buff.getvalue(), file_name=f"Rapor_{tablo}.xlsx", mime="application/vnd.ms-excel")
+            if tablo:
+                # Özet sütunları tek doküman okumasıyla çizilir; diğer sütunlar tam tarama ister
+                ozet = ozet_oku(tablo)
+                # Kurulumdan önceki yazmalar dokümanı yalnızca farklarla (surum'suz) oluşturur
+                gecerli = ozet is not None and ozet.get("surum") == OZET_SURUMU
+                if not gecerli:
+                    st.info("Bu tablo için özet yok ya da eski sürümde. Bir kez oluşturulduktan sonra yazmalarla birlikte güncel tutulur.")
+                if st.button("↻ Özeti Yeniden Kur" if gecerli else "Özeti Oluştur"):
+                    durum = st.empty()
+                    okunan = ozet_yeniden_kur(tablo, lambda n: durum.write(f"Okunan: {n}"))
+                    durum.empty()
+                    log_kayit_ekle("RAPOR", "rollup", "Özet Yeniden Kuruldu", f"{okunan} doküman", tablo=tablo)
+                    st.rerun()
+                if gecerli:
+                    rapor_grafikleri(ozet)
+            if tablo: tam_analiz(tablo)
+            if tablo: disa_aktarma_alani(tablo, f"Rapor_{tablo}")
 
         # 10. LOGLAR
         elif secim == "Log Kayıtları":
             st.header(t("menu_logs"))
-            if os.path.exists("Sistem_Loglari.xlsx"):
-                st.dataframe(pd.read_excel("Sistem_Loglari.xlsx").sort_index(ascending=False), use_container_width=True)
-            else: st.info("Log yok.")
+            log_bolumu()
 
         # 11. ADMIN PANELİ (GÜVENLİK DUVARI EKLENDİ)
         elif secim == "Kullanıcı Yönetimi (Admin)":
@@ -821,6 +3197,12 @@ def main():
                             log_kayit_ekle("ADMIN", "create_user", f"Kullanıcı Eklendi: {nu}")
                         else: st.error("Eksik bilgi (Ad, Şifre, E-posta).")
             
+            with st.expander("⏱ Yeniden Çalıştırma Süreleri"):
+                st.caption(f"Süreç başlangıcı {KURULUM['zaman']:%d.%m.%Y %H:%M} • DB bağlantısı {KURULUM['baglanti'] * 1000:.0f} ms • admin kontrolü {KURULUM['admin'] * 1000:.0f} ms")
+                olcumler = get_rerun_olcer().ozet()
+                if olcumler: st.dataframe(pd.DataFrame(olcumler), hide_index=True, use_container_width=True)
+                else: st.info("Henüz ölçüm yok.")
+
             st.subheader(t("user_list"))
             users = [u.to_dict() for u in db.collection("system_users").stream()]
             if users:
@@ -837,4 +3219,7 @@ def main():
                         else: st.error(t("err_self_del"))
 
 if __name__ == "__main__":
-    main()
+    t0 = time.perf_counter()
+    get_rerun_olcer().kaydet("Sabit yük (main öncesi)", t0 - BETIK_BASI)
+    try: main()
+    finally: get_rerun_olcer().kaydet(st.session_state.get("aktif_sayfa", "-"), time.perf_counter() - t0)
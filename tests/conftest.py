@@ -0,0 +1,30 @@
+# app.py içe aktarılırken Firebase bağlantısı kurar; testlerde istemci bellek içi
+# sahte Firestore ile değiştirilir. Streamlit betik dışında "bare" kipte çalışır.
+import importlib
+import os
+import sys
+
+import firebase_admin
+import pytest
+from firebase_admin import firestore
+
+sys.path.insert(0, os.path.dirname(__file__))
+from fake_firestore import SahteFirestore
+
+KOK = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore.client = lambda *args, **kwargs: SahteFirestore()
+    sys.path.insert(0, KOK)
+    # logs/ ve isler/ gibi göreli klasörler depo yerine geçici dizinde açılsın
+    os.chdir(tmp_path_factory.mktemp("calisma"))
+    return importlib.import_module("app")
+
+@pytest.fixture
+def db(app, monkeypatch):
+    # Her test boş bir veritabanıyla başlar
+    sahte = SahteFirestore()
+    monkeypatch.setattr(app, "db", sahte)
+    return sahte
@@ -0,0 +1,219 @@
+# Testler için bellek içi Firestore. Uygulamanın kullandığı alt küme taklit edilir:
+# koleksiyon / doküman okuma-yazma, batch, get_all, basit sorgular, count() ve
+# koleksiyon dinleyicisi (on_snapshot). Dinleyiciler her yazımdan sonra aynı
+# thread'de, gerçek istemcideki gibi (docs, changes, read_time) ile çağrılır.
+import datetime
+import itertools
+import operator
+import threading
+import types
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.watch import ChangeType
+
+OPERATORLER = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "in": lambda v, liste: v in liste}
+
+def _alan(ad):
+    return ad.strip("`") if isinstance(ad, str) else ad
+
+def _birlestir(eski, yeni):
+    # set(merge=True) / update anlamı; Increment, DELETE_FIELD, SERVER_TIMESTAMP ve dizi işlemleri dahil
+    sonuc = dict(eski)
+    for k, v in yeni.items():
+        if isinstance(v, dict): sonuc[k] = _birlestir(sonuc.get(k) if isinstance(sonuc.get(k), dict) else {}, v)
+        elif isinstance(v, firestore.Increment): sonuc[k] = sonuc.get(k, 0) + v.value
+        elif v is firestore.DELETE_FIELD: sonuc.pop(k, None)
+        elif v is firestore.SERVER_TIMESTAMP: sonuc[k] = datetime.datetime.now(datetime.timezone.utc)
+        elif isinstance(v, firestore.ArrayUnion): sonuc[k] = list(sonuc.get(k, [])) + [x for x in v.values if x not in sonuc.get(k, [])]
+        elif isinstance(v, firestore.ArrayRemove): sonuc[k] = [x for x in sonuc.get(k, []) if x not in v.values]
+        else: sonuc[k] = v
+    return sonuc
+
+class Dokuman:
+    def __init__(self, ref, veri):
+        self.reference, self.id = ref, ref.id
+        self._veri = veri
+        self.exists = veri is not None
+
+    def to_dict(self):
+        return None if self._veri is None else dict(self._veri)
+
+    def get(self, alan):
+        return (self._veri or {}).get(alan)
+
+class DokumanRef:
+    def __init__(self, db, yol, doc_id):
+        self.db, self.id = db, doc_id
+        self.parent = db.collection(yol)
+        self.path = f"{yol}/{doc_id}"
+
+    def get(self, field_paths=None):
+        return Dokuman(self, self.db._oku(self.parent._yol, self.id))
+
+    def set(self, veri, merge=False):
+        self.db._uygula([("set", self, veri, merge)])
+
+    def update(self, veri):
+        self.db._uygula([("set", self, veri, True)])
+
+    def delete(self):
+        self.db._uygula([("delete", self, None, False)])
+
+    def collection(self, ad):
+        return self.db.collection(f"{self.path}/{ad}")
+
+class Izleyici:
+    def __init__(self, db, yol, callback):
+        self.db, self.yol, self.callback = db, yol, callback
+
+    def unsubscribe(self):
+        self.db._dinleyici_kaldir(self)
+
+class Sorgu:
+    def __init__(self, db, yol, filtreler=(), sira=None, azalan=False, limit=None, sonrasi=None):
+        self.db, self._yol = db, yol
+        self.filtreler, self.sira, self.azalan, self._limit, self.sonrasi = filtreler, sira, azalan, limit, sonrasi
+
+    def _kopya(self, **degisen):
+        alanlar = dict(filtreler=self.filtreler, sira=self.sira, azalan=self.azalan, limit=self._limit, sonrasi=self.sonrasi)
+        alanlar.update(degisen)
+        return Sorgu(self.db, self._yol, **alanlar)
+
+    def where(self, filter):
+        return self._kopya(filtreler=self.filtreler + (filter,))
+
+    def select(self, alanlar):
+        return self._kopya()
+
+    def order_by(self, alan, direction=None):
+        return self._kopya(sira=_alan(alan), azalan=direction == firestore.Query.DESCENDING)
+
+    def limit(self, n):
+        return self._kopya(limit=n)
+
+    def start_after(self, imlec):
+        return self._kopya(sonrasi=list(imlec.values())[0])
+
+    def count(self):
+        sayi = len(self._calistir())
+        return types.SimpleNamespace(get=lambda: [[types.SimpleNamespace(value=sayi)]])
+
+    def _deger(self, doc_id, veri, alan):
+        return doc_id if alan in (None, "__name__") else veri.get(alan)
+
+    def _calistir(self):
+        sonuc = []
+        for doc_id, veri in self.db._koleksiyon(self._yol).items():
+            uygun = True
+            for f in self.filtreler:
+                deger = self._deger(doc_id, veri, _alan(f.field_path))
+                try: uygun = uygun and deger is not None and OPERATORLER[f.op_string](deger, f.value)
+                except TypeError: uygun = False
+            if uygun: sonuc.append((doc_id, veri))
+        sonuc.sort(key=lambda d: (self._deger(*d, self.sira) is None, self._deger(*d, self.sira)), reverse=self.azalan)
+        if self.sonrasi is not None: sonuc = [d for d in sonuc if self._deger(*d, self.sira) > self.sonrasi]
+        if self._limit: sonuc = sonuc[:self._limit]
+        return [Dokuman(DokumanRef(self.db, self._yol, doc_id), veri) for doc_id, veri in sonuc]
+
+    def stream(self):
+        return iter(self._calistir())
+
+    def get(self):
+        return self._calistir()
+
+class Koleksiyon(Sorgu):
+    _sayac = itertools.count()
+
+    def __init__(self, db, yol):
+        super().__init__(db, yol)
+        self.id = yol.split("/")[-1]
+
+    def document(self, doc_id=None):
+        return DokumanRef(self.db, self._yol, doc_id or f"otomatik{next(self._sayac):012d}")
+
+    def on_snapshot(self, callback):
+        return self.db._dinleyici_ekle(self._yol, callback)
+
+class Batch:
+    def __init__(self, db):
+        self.db, self.islemler = db, []
+
+    def set(self, ref, veri, merge=False):
+        self.islemler.append(("set", ref, veri, merge))
+
+    def update(self, ref, veri):
+        self.islemler.append(("set", ref, veri, True))
+
+    def delete(self, ref):
+        self.islemler.append(("delete", ref, None, False))
+
+    def commit(self):
+        self.db._uygula(self.islemler)
+
+class SahteFirestore:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.veri = {}          # koleksiyon yolu -> {doc_id: veri}
+        self.dinleyiciler = []
+
+    def collection(self, yol):
+        return Koleksiyon(self, yol)
+
+    def collections(self):
+        with self.lock: return [Koleksiyon(self, yol) for yol in self.veri if "/" not in yol]
+
+    def batch(self):
+        return Batch(self)
+
+    def get_all(self, refs, field_paths=None):
+        for ref in refs: yield ref.get()
+
+    def _koleksiyon(self, yol):
+        with self.lock: return dict(self.veri.get(yol, {}))
+
+    def _oku(self, yol, doc_id):
+        with self.lock: return self.veri.get(yol, {}).get(doc_id)
+
+    def _uygula(self, islemler):
+        # Batch tek seferde uygulanır; dinleyiciler koleksiyon başına tek bildirim alır
+        degisimler = {}
+        with self.lock:
+            for tur, ref, veri, merge in islemler:
+                koleksiyon = self.veri.setdefault(ref.parent._yol, {})
+                eski = koleksiyon.get(ref.id)
+                if tur == "delete":
+                    if eski is None: continue
+                    del koleksiyon[ref.id]
+                    degisim = ChangeType.REMOVED
+                else:
+                    koleksiyon[ref.id] = _birlestir((eski or {}) if merge else {}, veri)
+                    degisim = ChangeType.ADDED if eski is None else ChangeType.MODIFIED
+                onceki = degisimler.get(ref.parent._yol, {}).get(ref.id)
+                # Aynı batch'te eklenip değiştirilen doküman eklenmiş sayılır
+                if onceki == ChangeType.ADDED and degisim == ChangeType.MODIFIED: degisim = ChangeType.ADDED
+                degisimler.setdefault(ref.parent._yol, {})[ref.id] = degisim
+            dinleyiciler = [d for d in self.dinleyiciler if d.yol in degisimler]
+            bildirimler = [(d, self._bildirim(d.yol, degisimler[d.yol])) for d in dinleyiciler]
+        for dinleyici, (docs, changes, zaman) in bildirimler: dinleyici.callback(docs, changes, zaman)
+
+    def _bildirim(self, yol, degisimler):
+        koleksiyon = self.veri.get(yol, {})
+        docs = [Dokuman(DokumanRef(self, yol, doc_id), dict(veri)) for doc_id, veri in koleksiyon.items()]
+        changes = []
+        for doc_id, tur in degisimler.items():
+            veri = koleksiyon.get(doc_id)
+            changes.append(types.SimpleNamespace(type=tur, document=Dokuman(DokumanRef(self, yol, doc_id), None if veri is None else dict(veri))))
+        return docs, changes, datetime.datetime.now(datetime.timezone.utc)
+
+    def _dinleyici_ekle(self, yol, callback):
+        izleyici = Izleyici(self, yol, callback)
+        with self.lock:
+            self.dinleyiciler.append(izleyici)
+            # İlk anlık görüntü: mevcut her doküman eklenmiş olarak bildirilir
+            bildirim = self._bildirim(yol, {doc_id: ChangeType.ADDED for doc_id in self.veri.get(yol, {})})
+        callback(*bildirim)
+        return izleyici
+
+    def _dinleyici_kaldir(self, izleyici):
+        with self.lock:
+            if izleyici in self.dinleyiciler: self.dinleyiciler.remove(izleyici)
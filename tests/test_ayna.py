@@ -0,0 +1,82 @@
+import pandas as pd
+
+def _doldur(db, tablo, n):
+    batch = db.batch()
+    for i in range(n):
+        batch.set(db.collection(tablo).document(f"d{i:04d}"), {"Makine": f"M{i}", "Adet": i})
+    batch.commit()
+
+def _sirala(df):
+    # Delta yolunda yeni sütunun eksikleri None, baştan kurulan çerçevede NaN olur
+    df = df.sort_values("Dokuman_ID").reset_index(drop=True).astype(object)
+    return df.where(df.notna(), None)
+
+def _depodaki(app, db, tablo):
+    return _sirala(app._tablo_oku(tablo))
+
+def _ayni(app, db, tablo, df):
+    beklenen = _depodaki(app, db, tablo)
+    pd.testing.assert_frame_equal(_sirala(df)[beklenen.columns], beklenen, check_dtype=False)
+
+def test_ilk_goruntu(app, db):
+    _doldur(db, "T", 20)
+    ayna = app.TabloAyna(db.collection("T"))
+    df = ayna.frame()
+    assert len(df) == 20
+    _ayni(app, db, "T", df)
+
+def test_ekleme_degistirme_silme_deltalari(app, db, monkeypatch):
+    _doldur(db, "T", 20)
+    ayna = app.TabloAyna(db.collection("T"))
+    ayna.frame()
+    ref = db.collection("T")
+    ref.document("yeni").set({"Makine": "X", "Adet": 99, "Renk": "Mavi"})
+    ref.document("d0003").update({"Adet": 1000})
+    ref.document("d0007").delete()
+    # Birkaç değişiklik baştan kurmaya yol açmaz, deltalar uygulanır
+    assert len(ayna.bekleyen) == 3
+    cagrilar = []
+    uygula = ayna._deltalari_uygula
+    monkeypatch.setattr(ayna, "_deltalari_uygula", lambda: cagrilar.append(1) or uygula())
+    df = ayna.frame()
+    assert cagrilar == [1]
+    assert len(df) == 20
+    assert "d0007" not in set(df["Dokuman_ID"])
+    assert df.set_index("Dokuman_ID").loc["d0003", "Adet"] == 1000
+    assert df.set_index("Dokuman_ID").loc["yeni", "Renk"] == "Mavi"
+    _ayni(app, db, "T", df)
+
+def test_ozet_alani_aynaya_girmez(app, db):
+    ayna = app.TabloAyna(db.collection("T"))
+    ayna.frame()
+    db.collection("T").document("a").set({"Makine": "A", "_ozet": {"Makine": "A"}})
+    assert "_ozet" not in ayna.frame().columns
+
+def test_cok_degisiklikte_yeniden_kurulur(app, db, monkeypatch):
+    _doldur(db, "T", 100)
+    ayna = app.TabloAyna(db.collection("T"))
+    ayna.frame()
+    monkeypatch.setattr(ayna, "_deltalari_uygula", lambda: (_ for _ in ()).throw(AssertionError("delta yolu kullanıldı")))
+    batch = db.batch()
+    ref = db.collection("T")
+    for i in range(0, 60):
+        batch.update(ref.document(f"d{i:04d}"), {"Adet": -i})
+    for i in range(60, 80):
+        batch.delete(ref.document(f"d{i:04d}"))
+    batch.commit()
+    assert len(ayna.bekleyen) > max(50, len(ayna.satirlar) // 10)
+    df = ayna.frame()
+    assert len(df) == 80
+    assert ayna.bekleyen == {}
+    _ayni(app, db, "T", df)
+
+def test_havuz_eski_aynayi_kapatir(app, db):
+    for tablo in ("A", "B", "C"):
+        _doldur(db, tablo, 3)
+    havuz = app.AynaHavuzu(2)
+    havuz.frame("A", db.collection("A"))
+    havuz.frame("B", db.collection("B"))
+    havuz.frame("A", db.collection("A"))
+    havuz.frame("C", db.collection("C"))
+    assert list(havuz.aynalar) == ["A", "C"]
+    assert sorted(d.yol for d in db.dinleyiciler) == ["A", "C"]